@@ -0,0 +1,219 @@
+"""
+Batch runner for mass headless game simulations and parameter sweeps.
+
+Every combination of --param values is run for --episodes seeds, fanned out
+over a process pool. Results are streamed to one JSONL (or .csv) file as
+episodes finish; only a bounded window of episodes is ever in flight, so
+memory stays flat however many are run.
+
+    python batch.py invaders --param ENEMY_SPEED=1,2,3 --param BULLET_SPEED=-10,-15 \\
+        --episodes 500 --policy random --out sweep.jsonl
+"""
+import argparse
+import concurrent.futures
+import csv
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+from headless import make_game
+
+RESULT_FIELDS = ('episode', 'game', 'policy', 'seed', 'params', 'outcome', 'death_cause',
+                 'score', 'ticks', 'time_to_win')
+
+
+# --- Input policies ---
+# A policy is called once per tick with (rng, tick, state) and returns the keys
+# held down for that tick.
+
+def invaders_random(rng, tick, world):
+    return [rng.choice(('Left', 'Right', 'space', None))]
+
+
+def invaders_sweep(rng, tick, world):
+    """Walks the ship back and forth under the formation, firing constantly."""
+    return ['Right' if (tick // 70) % 2 == 0 else 'Left', 'space']
+
+
+def platformer_random(rng, tick, game):
+    return [key for key in ('Left', 'Right', 'Up') if rng.random() < 0.4]
+
+
+def platformer_run_jump(rng, tick, game):
+    """Holds Right and jumps at a fixed rhythm."""
+    return ['Right'] + (['Up'] if tick % 30 == 0 else [])
+
+
+POLICIES = {
+    'invaders': {'random': invaders_random, 'sweep': invaders_sweep},
+    'platformer': {'random': platformer_random, 'run_jump': platformer_run_jump},
+}
+
+
+# --- Episodes ---
+
+def run_invaders(spec):
+    invaders = importlib.import_module("space invader")
+    world = invaders.InvadersWorld(seed=spec['seed'])
+    for name, value in spec['params'].items():
+        setattr(world, name, value)
+    world.reset(spec['seed'])
+    policy = POLICIES['invaders'][spec['policy']]
+    rng = random.Random(spec['seed'])
+    while not world.game_over and world.tick < spec['max_ticks']:
+        for key in policy(rng, world.tick, world):
+            if key:
+                world.apply_key(key)
+        world.step()
+
+    if not world.game_over:
+        outcome, cause = 'timeout', None
+    elif not world.enemy_count and world.lives > 0:
+        outcome, cause = 'win', None
+    else:
+        outcome, cause = 'death', 'invaders_reached_player'
+    return {'outcome': outcome, 'death_cause': cause, 'score': world.score, 'ticks': world.tick,
+            'time_to_win': world.tick if outcome == 'win' else None}
+
+
+def run_platformer(spec):
+    platformer = importlib.import_module("jumping platformer")
+    game, _ = make_game(platformer, 'PlatformerGame', False, **spec['params'])
+    game.is_running = True
+    policy = POLICIES['platformer'][spec['policy']]
+    rng = random.Random(spec['seed'])
+    outcome, cause = 'timeout', None
+    while game.is_running and game.tick < spec['max_ticks']:
+        held = policy(rng, game.tick, game)
+        for key in ('Left', 'Right', 'Up'):
+            game.keys_pressed[key] = key in held
+        game.update()
+    if not game.is_running:
+        # end_game() has run, so the outcome is whichever check fired.
+        won = game.last_message == "You Win!"
+        outcome, cause = ('win', None) if won else ('death', 'enemy')
+    return {'outcome': outcome, 'death_cause': cause, 'score': None, 'ticks': game.tick,
+            'time_to_win': game.tick if outcome == 'win' else None}
+
+
+RUNNERS = {'invaders': run_invaders, 'platformer': run_platformer}
+
+
+def game_constants(game):
+    """Returns the names --param can set for game: its upper-case constants."""
+    if game == 'invaders':
+        state = importlib.import_module("space invader").InvadersWorld(seed=0)
+    else:
+        state, _ = make_game(importlib.import_module("jumping platformer"), 'PlatformerGame', False)
+    return {name for name in vars(state) if name.isupper()}
+
+
+def run_episode(spec):
+    """Pool worker: runs one episode and returns its result row."""
+    result = RUNNERS[spec['game']](spec)
+    result.update(episode=spec['episode'], game=spec['game'], policy=spec['policy'],
+                  seed=spec['seed'], params=spec['params'])
+    return result
+
+
+def episode_specs(game, sweep, episodes, policy, max_ticks, base_seed):
+    """Lazily yields one spec per (parameter combination, seed)."""
+    names = list(sweep)
+    episode = 0
+    for values in itertools.product(*(sweep[name] for name in names)):
+        params = dict(zip(names, values))
+        for n in range(episodes):
+            yield {'episode': episode, 'game': game, 'params': params, 'policy': policy,
+                   'seed': base_seed + n, 'max_ticks': max_ticks}
+            episode += 1
+
+
+def parse_param(text):
+    """Parses NAME=v1,v2,... into (NAME, [numbers])."""
+    name, _, values = text.partition('=')
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=v1,v2,... but got {text!r}")
+    return name, [float(v) if '.' in v else int(v) for v in values.split(',')]
+
+
+class ResultWriter:
+    """Appends result rows to a JSONL or CSV file as they arrive."""
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.csv = None
+        if os.path.splitext(path)[1].lower() == '.csv':
+            self.csv = csv.DictWriter(self.file, fieldnames=RESULT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(dict(row, params=json.dumps(row['params'], sort_keys=True)))
+        else:
+            self.file.write(json.dumps(row) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch(specs, writer, workers, in_flight):
+    """Runs specs on a process pool, keeping at most in_flight submitted; returns outcome counts."""
+    counts = {}
+    done = 0
+    start = time.perf_counter()
+    specs = iter(specs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(run_episode, spec) for spec in itertools.islice(specs, in_flight)}
+        while pending:
+            finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                row = future.result()
+                writer.write(row)
+                counts[row['outcome']] = counts.get(row['outcome'], 0) + 1
+                done += 1
+                if done % 1000 == 0:
+                    rate = done / (time.perf_counter() - start)
+                    print(f"{done} episodes ({rate:.0f}/s)", file=sys.stderr)
+            pending |= {pool.submit(run_episode, spec) for spec in itertools.islice(specs, len(finished))}
+    return counts, done, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless game episodes in parallel.")
+    parser.add_argument('game', choices=sorted(RUNNERS))
+    parser.add_argument('--param', type=parse_param, action='append', default=[], metavar='NAME=V1,V2',
+                        help="game constant to sweep, e.g. ENEMY_SPEED=1,2,3 (repeatable)")
+    parser.add_argument('--episodes', type=int, default=100, help="seeds per parameter combination")
+    parser.add_argument('--policy', help="input policy (default: the game's first policy)")
+    parser.add_argument('--max-ticks', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0, help="first seed")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', default='batch_results.jsonl', help="output file (.jsonl or .csv)")
+    args = parser.parse_args(argv)
+
+    policy = args.policy or next(iter(POLICIES[args.game]))
+    if policy not in POLICIES[args.game]:
+        parser.error(f"unknown policy {policy!r}; choose from {', '.join(POLICIES[args.game])}")
+    sweep = dict(args.param)
+    unknown = sorted(set(sweep) - game_constants(args.game))
+    if unknown:
+        parser.error(f"{args.game} has no constant {', '.join(map(repr, unknown))}; "
+                     f"choose from {', '.join(sorted(game_constants(args.game)))}")
+    specs = episode_specs(args.game, sweep, args.episodes, policy, args.max_ticks, args.seed)
+
+    writer = ResultWriter(args.out)
+    try:
+        counts, done, elapsed = run_batch(specs, writer, args.workers, in_flight=args.workers * 4)
+    finally:
+        writer.close()
+    summary = ', '.join(f"{outcome}: {count}" for outcome, count in sorted(counts.items()))
+    print(f"{done} episodes in {elapsed:.1f} s on {args.workers} workers ({summary}); "
+          f"results in {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Benchmarks for the game simulations.
+
+Drives SpaceInvaders and PlatformerGame through scripted scenarios at
+increasing scale and reports ticks per second, per-tick latency percentiles,
+Tk calls per tick, canvas item count and peak memory. Runs headless against a stub canvas by
+default; pass --real-tk to draw on a real Tk root instead (for example under
+xvfb-run). Results can be saved as a baseline and later runs compared to it.
+
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.15
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from headless import make_game
+from levels import GridIndex, generate_level
+from profiler import percentile
+
+invaders = importlib.import_module("space invader")
+platformer = importlib.import_module("jumping platformer")
+
+
+def tk_calls(game):
+    return getattr(game.canvas, 'calls', 0)
+
+
+# --- Scenarios ---
+
+def invaders_scenario(enemies, bullets):
+    """N invaders in a square-ish formation with M bullets kept in flight."""
+    def setup(real_tk):
+        game, root = make_game(invaders, 'SpaceInvaders', real_tk)
+        world = game.world
+        world.ENEMY_COLS = max(1, int(enemies ** 0.5 * 1.5))
+        world.ENEMY_ROWS = -(-enemies // world.ENEMY_COLS)
+        world.ENEMY_SPACING_X = world.ENEMY_SPACING_Y = 12
+        world.ENEMY_SIZE = 10
+        world.HEIGHT = max(world.HEIGHT, world.ENEMY_ROWS * 12 + 400)
+        world.BULLET_POOL_SIZE = bullets
+        world.FIRE_COOLDOWN = 0
+        game.is_running = True
+        game.reset_game()
+        return game, root
+
+    def tick(game, n):
+        world = game.world
+        if world.game_over:
+            game.is_running = True
+            game.reset_game()
+        world.move_player(world.PLAYER_SPEED if (n // 60) % 2 else -world.PLAYER_SPEED)
+        while world.fire_bullet() is not None:
+            pass
+        game.update()
+        if game.is_running:
+            game.render()
+
+    return f"invaders N={enemies} M={bullets}", setup, tick
+
+
+def platformer_scenario(platforms):
+    """A generated K-platform level with the player running and jumping."""
+    level = generate_level(platforms, n_enemies=platforms // 10)
+    level.enemies = [(x1, y1 - 1000, x2, y2 - 1000) for x1, y1, x2, y2 in level.enemies]
+    level.enemy_index = GridIndex(level.enemies)  # enemies lifted out of reach so runs never end
+
+    def setup(real_tk):
+        game, root = make_game(platformer, 'PlatformerGame', real_tk, level)
+        game.is_running = True
+        return game, root
+
+    def tick(game, n):
+        keys = game.keys_pressed
+        keys['Right'] = (n // 50) % 2 == 0
+        keys['Left'] = not keys['Right']
+        keys['Up'] = n % 25 == 0
+        game.update()
+        game.render()
+
+    return f"platformer K={platforms}", setup, tick
+
+
+def scenarios(scales):
+    for scale in scales:
+        yield invaders_scenario(30 * scale, 8 * scale)
+    for scale in scales:
+        yield platformer_scenario(6 * scale ** 2)
+
+
+# --- Runner ---
+
+def timed_run(setup, tick, ticks, real_tk, warmup=50):
+    """Runs one scenario instance; returns (seconds, sorted per-tick latencies, Tk calls)."""
+    game, root = setup(real_tk)
+    for n in range(warmup):
+        tick(game, n)
+    clock = time.perf_counter
+    latencies = []
+    calls_before = tk_calls(game)
+    start = clock()
+    for n in range(warmup, warmup + ticks):
+        t0 = clock()
+        tick(game, n)
+        latencies.append(clock() - t0)
+    total = clock() - start
+    calls = tk_calls(game) - calls_before
+    items = len(getattr(game.canvas, 'items', ()))
+    if root is not None:
+        root.destroy()
+    latencies.sort()
+    return total, latencies, calls, items
+
+
+def run_scenario(setup, tick, ticks, real_tk, repeat=3):
+    """Keeps the fastest of several runs, which is the least disturbed by machine noise."""
+    total, latencies, calls, items = min(timed_run(setup, tick, ticks, real_tk) for _ in range(repeat))
+
+    # Memory is measured in a separate, shorter pass so tracing does not skew timings.
+    tracemalloc.start()
+    game, root = setup(real_tk)
+    for n in range(min(ticks, 200)):
+        tick(game, n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if root is not None:
+        root.destroy()
+
+    return {
+        'ticks_per_sec': ticks / total,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'tk_calls_per_tick': calls / ticks,
+        'tk_items': items,
+        'peak_kb': peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of scenarios whose throughput fell more than tolerance below baseline."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result['ticks_per_sec'] < previous['ticks_per_sec'] * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game simulations.")
+    parser.add_argument('--ticks', type=int, default=500, help="ticks per scenario")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario; the fastest is kept")
+    parser.add_argument('--scales', default="1,4,16", help="comma-separated scale factors")
+    parser.add_argument('--baseline', default="bench_baseline.json", help="baseline file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="write this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed fractional drop in ticks/sec before flagging a regression")
+    parser.add_argument('--real-tk', action='store_true', help="use a real Tk root (needs a display)")
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'scenario':<28}{'ticks/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'tk/tick':>9}{'items':>8}{'peak KB':>10}  vs baseline")
+    for name, setup, tick in scenarios(scales):
+        result = results[name] = run_scenario(setup, tick, args.ticks, args.real_tk, args.repeat)
+        previous = baseline.get(name)
+        change = (f"{result['ticks_per_sec'] / previous['ticks_per_sec'] - 1:+.1%}"
+                  if previous else "-")
+        print(f"{name:<28}{result['ticks_per_sec']:>10.0f}{result['p50_ms']:>9.3f}"
+              f"{result['p95_ms']:>9.3f}{result['p99_ms']:>9.3f}"
+              f"{result['tk_calls_per_tick']:>9.1f}{result['tk_items']:>8}{result['peak_kb']:>10.1f}  {change}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f"REGRESSION: {name}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import sys
+import time
+
+
+class FixedTimestepLoop:
+    """
+    Drives a Tk game at a fixed simulation rate, independent of frame cost.
+    Real time measured with time.perf_counter() is collected in an accumulator
+    and spent in fixed steps of 1/tick_rate seconds; the game is then drawn
+    once. Rendering runs at render_rate and drops frames under load, while the
+    simulation keeps its pace. Frames whose work overruns the frame budget are
+    counted and reported when the loop stops.
+    """
+    def __init__(self, master, update, render, tick_rate=50, render_rate=None, max_steps=5):
+        self.master = master
+        self.update = update
+        self.render = render
+        self.step_interval = 1.0 / tick_rate
+        self.frame_interval = 1.0 / (render_rate or tick_rate)
+        self.max_steps = max_steps  # steps per frame before sim time is dropped
+
+        self.running = False
+        self.after_id = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.frames = 0
+        self.dropped_frames = 0
+        self.dropped_ticks = 0
+        self.overrun_frames = 0
+        self.overrun_total = 0.0
+        self.overrun_max = 0.0
+
+    def start(self):
+        """Starts stepping; the first frame runs one simulation step immediately."""
+        if self.running:
+            return
+        self.running = True
+        self.reset_stats()
+        self.previous = time.perf_counter()
+        self.next_frame = self.previous
+        self.accumulator = self.step_interval
+        self.frame()
+
+    def stop(self):
+        """Stops the loop; safe to call from inside update()."""
+        if not self.running:
+            return
+        self.running = False
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
+        if self.overrun_frames or self.dropped_ticks:
+            print(self.report(), file=sys.stderr)
+
+    def frame(self):
+        """Runs the fixed steps owed since the last frame, renders, and reschedules."""
+        self.after_id = None
+        if not self.running:
+            return
+
+        start = time.perf_counter()
+        self.accumulator += start - self.previous
+        self.previous = start
+
+        steps = 0
+        while self.accumulator >= self.step_interval:
+            if steps == self.max_steps:
+                # Too far behind to catch up: drop the backlog rather than spiral.
+                owed = int(self.accumulator / self.step_interval)
+                self.dropped_ticks += owed
+                self.accumulator -= owed * self.step_interval
+                break
+            self.update()
+            self.accumulator -= self.step_interval
+            self.ticks += 1
+            steps += 1
+            if not self.running:
+                return
+
+        if steps:
+            self.render()
+            self.frames += 1
+
+        now = time.perf_counter()
+        work = now - start
+        if work > self.frame_interval:
+            self.overrun_frames += 1
+            self.overrun_total += work - self.frame_interval
+            self.overrun_max = max(self.overrun_max, work - self.frame_interval)
+
+        # Pace against absolute deadlines so scheduling jitter does not add up.
+        self.next_frame += self.frame_interval
+        if self.next_frame < now:
+            missed = int((now - self.next_frame) / self.frame_interval) + 1
+            self.dropped_frames += missed
+            self.next_frame += missed * self.frame_interval
+        delay = max(0, int((self.next_frame - now) * 1000))
+        self.after_id = self.master.after(delay, self.frame)
+
+    def report(self):
+        """Returns a one-line summary of pacing and overruns."""
+        return (f"{self.ticks} ticks, {self.frames} frames, {self.dropped_frames} frames dropped, "
+                f"{self.dropped_ticks} ticks dropped, {self.overrun_frames} overruns "
+                f"(max {self.overrun_max * 1000:.1f} ms, total {self.overrun_total * 1000:.1f} ms)")
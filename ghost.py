@@ -0,0 +1,191 @@
+"""
+Speedrun ghosts for the jumping platformer.
+
+A ghost is the player's position on every simulation tick of a run, written
+to disk as the run goes and played back as an overlay on later attempts.
+Positions are delta-encoded and run-length coded, so running or standing
+still costs a few bytes per stretch rather than per tick:
+
+    header   magic b'PGHO', version, tick rate, level key (16 bytes),
+             start x/y (int32), tick count and finished flag (patched on close)
+    body     runs of (varint count, zigzag varint dx, zigzag varint dy),
+             ended by a zero count
+
+Ghosts are stored per level under GAME_GHOSTS (default
+~/.local/share/platformer-ghosts; empty disables), keyed by a hash of the
+whole level and the physics constants, so only runs of the same level under
+the same rules are compared. The fastest finished run for a level is kept
+as its best ghost.
+Readers decode forward from a small buffer, so playback memory does not grow
+with the length of the run.
+
+    python ghost.py ~/.local/share/platformer-ghosts/<run key>.best.ghost
+"""
+import os
+import struct
+import sys
+
+from replay import encode_varint
+
+MAGIC = b'PGHO'
+VERSION = 1
+HEADER = struct.Struct('<4sBH16siiIB')
+TICKS_OFFSET = struct.calcsize('<4sBH16sii')
+READ_SIZE = 4096
+
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def ghost_dir():
+    directory = os.environ.get('GAME_GHOSTS')
+    if directory is None:
+        directory = os.path.join(os.path.expanduser('~'), '.local', 'share', 'platformer-ghosts')
+    return directory
+
+
+def best_path(directory, key):
+    return os.path.join(directory, f"{key}.best.ghost")
+
+
+class GhostWriter:
+    """Streams one run's per-tick positions to a ghost file."""
+    def __init__(self, path, key, tick_rate, start):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, tick_rate, bytes.fromhex(key), int(start[0]),
+                                    int(start[1]), 0, 0))
+        self.last = (int(start[0]), int(start[1]))
+        self.delta = None
+        self.count = 0
+        self.ticks = 0
+
+    def add(self, x, y):
+        """Records the position after one tick."""
+        x, y = int(x), int(y)
+        delta = (x - self.last[0], y - self.last[1])
+        self.last = (x, y)
+        self.ticks += 1
+        if delta == self.delta:
+            self.count += 1
+            return
+        self.flush_run()
+        self.delta = delta
+        self.count = 1
+
+    def flush_run(self):
+        if self.count:
+            dx, dy = self.delta
+            self.file.write(encode_varint(self.count) + encode_varint(zigzag(dx)) + encode_varint(zigzag(dy)))
+
+    def close(self, finished):
+        """Ends the stream and fills in the tick count and finished flag in the header."""
+        if self.file is None:
+            return
+        self.flush_run()
+        self.file.write(encode_varint(0))
+        self.file.seek(TICKS_OFFSET)
+        self.file.write(struct.pack('<IB', self.ticks, 1 if finished else 0))
+        self.file.close()
+        self.file = None
+
+
+class GhostReader:
+    """Plays a ghost file forward one tick at a time, decoding from a small read buffer."""
+    def __init__(self, path):
+        self.file = open(path, 'rb', buffering=0)
+        magic, version, self.tick_rate, key, x, y, self.ticks, finished = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is not a version {VERSION} ghost")
+        self.key = key.hex()
+        self.finished = bool(finished)
+        self.position = (x, y)
+        self.tick = 0
+        self.buffer = b''
+        self.offset = 0
+        self.delta = (0, 0)
+        self.remaining = 0
+        self.ended = False
+
+    def read_varint(self):
+        value = shift = 0
+        while True:
+            if self.offset == len(self.buffer):
+                self.buffer = self.file.read(READ_SIZE)
+                self.offset = 0
+                if not self.buffer:
+                    raise EOFError
+            byte = self.buffer[self.offset]
+            self.offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def advance(self, tick):
+        """Moves forward to tick (never back) and returns the position there; stops at the end of the run."""
+        while self.tick < tick and not self.ended:
+            if not self.remaining:
+                try:
+                    self.remaining = self.read_varint()
+                    if self.remaining:
+                        self.delta = (unzigzag(self.read_varint()), unzigzag(self.read_varint()))
+                except EOFError:
+                    self.remaining = 0  # the run was cut off; hold the last position
+                if not self.remaining:
+                    self.ended = True
+                    break
+            steps = min(self.remaining, tick - self.tick)
+            self.position = (self.position[0] + self.delta[0] * steps, self.position[1] + self.delta[1] * steps)
+            self.remaining -= steps
+            self.tick += steps
+        return self.position
+
+    def close(self):
+        self.file.close()
+
+
+def finished_ticks(path):
+    """Returns the tick count of a finished ghost, or None if path is missing, unfinished or unreadable."""
+    try:
+        reader = GhostReader(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    reader.close()
+    return reader.ticks if reader.finished else None
+
+
+def keep_if_best(run_path, best, finished):
+    """Promotes a just-closed run to the level's best ghost if it finished faster; otherwise deletes it."""
+    if finished:
+        ticks = finished_ticks(run_path)
+        previous = finished_ticks(best)
+        if ticks is not None and (previous is None or ticks < previous):
+            os.replace(run_path, best)
+            return True
+    os.remove(run_path)
+    return False
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python ghost.py GHOST", file=sys.stderr)
+        return 2
+    reader = GhostReader(argv[0])
+    reader.advance(reader.ticks)
+    status = "finished" if reader.finished else "unfinished"
+    print(f"{status} run of {reader.ticks} ticks ({reader.ticks / reader.tick_rate:.2f} s), "
+          f"{os.path.getsize(argv[0])} bytes, ends at {reader.position}")
+    reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
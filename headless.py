@@ -0,0 +1,134 @@
+"""
+In-memory stand-ins for the Tk widgets the games use, so they can run without a display.
+"""
+import types
+
+
+class StubWidget:
+    """Stands in for any Tk widget the games pack or configure."""
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def pack(self, **kwargs):
+        pass
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+
+    configure = config
+
+
+class StubCanvas(StubWidget):
+    """
+    An in-memory tk.Canvas with the same item, tag and coords semantics the
+    games rely on. Counts every call so benchmarks can report Tk traffic.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = {}  # item id -> [coords list, tags tuple]
+        self.tagged = {}  # tag -> set of item ids
+        self.next_item = 0
+        self.calls = 0
+
+    def find(self, tag_or_id):
+        if isinstance(tag_or_id, int):
+            return [tag_or_id] if tag_or_id in self.items else []
+        if tag_or_id == "all":
+            return list(self.items)
+        return list(self.tagged.get(tag_or_id, ()))
+
+    def create(self, coords, kwargs):
+        self.calls += 1
+        self.next_item += 1
+        tags = kwargs.get('tags', ())
+        tags = (tags,) if isinstance(tags, str) else tuple(tags)
+        self.items[self.next_item] = [list(coords), tags]
+        for tag in tags:
+            self.tagged.setdefault(tag, set()).add(self.next_item)
+        return self.next_item
+
+    def create_rectangle(self, *coords, **kwargs):
+        return self.create(coords, kwargs)
+
+    create_oval = create_rectangle
+    create_text = create_rectangle
+    create_line = create_rectangle
+
+    def coords(self, tag_or_id, *coords):
+        self.calls += 1
+        found = self.find(tag_or_id)
+        if not coords:
+            return list(self.items[found[0]][0]) if found else []
+        if len(coords) == 1:
+            coords = coords[0]
+        for item in found:
+            self.items[item][0] = [float(value) for value in coords]
+
+    def move(self, tag_or_id, dx, dy):
+        self.calls += 1
+        items = self.items
+        for item in self.find(tag_or_id):
+            coords = items[item][0]
+            coords[0::2] = [x + dx for x in coords[0::2]]
+            coords[1::2] = [y + dy for y in coords[1::2]]
+
+    def delete(self, *tags_or_ids):
+        self.calls += 1
+        for tag_or_id in tags_or_ids:
+            for item in self.find(tag_or_id):
+                for tag in self.items.pop(item)[1]:
+                    self.tagged[tag].discard(item)
+
+    def itemconfigure(self, tag_or_id, **kwargs):
+        self.calls += 1
+        if 'tags' in kwargs:
+            tags = kwargs['tags']
+            tags = (tags,) if isinstance(tags, str) else tuple(tags)
+            for item in self.find(tag_or_id):
+                for tag in self.items[item][1]:
+                    self.tagged[tag].discard(item)
+                self.items[item][1] = tags
+                for tag in tags:
+                    self.tagged.setdefault(tag, set()).add(item)
+
+    itemconfig = itemconfigure
+
+    def xview_moveto(self, fraction):
+        self.calls += 1
+        region = self.options.get('scrollregion', (0, 0, self.options.get('width', 0), 0))
+        self.view_x = fraction * (region[2] - region[0])
+
+    def canvasx(self, x):
+        return getattr(self, 'view_x', 0) + x
+
+    def canvasy(self, y):
+        return y
+
+    def winfo_reqwidth(self):
+        return self.options.get('width', 0)
+
+    def winfo_reqheight(self):
+        return self.options.get('height', 0)
+
+
+class StubTk:
+    """A Tk root that accepts the calls the games make and never schedules anything."""
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+STUB_TK = types.SimpleNamespace(Canvas=StubCanvas, Label=StubWidget, Frame=StubWidget)
+
+
+def make_game(module, cls_name, real_tk, *args, **kwargs):
+    """Builds a game on a stub root, or on a real (possibly virtual) display."""
+    if real_tk:
+        import tkinter
+        root = tkinter.Tk()
+        return getattr(module, cls_name)(root, *args, **kwargs), root
+    real = module.tk
+    module.tk = STUB_TK
+    try:
+        return getattr(module, cls_name)(StubTk(), *args, **kwargs), None
+    finally:
+        module.tk = real
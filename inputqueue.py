@@ -0,0 +1,159 @@
+"""
+Timestamped keyboard input shared by both games.
+
+Tk key events are queued as they arrive, stamped with time.perf_counter(),
+and applied by the game at the start of a simulation tick, so movement
+depends on the tick rate rather than on the OS key-repeat rate. Each press
+that changes the game's input is timed until the frame drawing its result
+has been handed to the display (the first idle callback after the render,
+which runs after Tk's own canvas redraw), and the latencies are collected
+in a histogram.
+
+GAME_LATENCY=<file> prints the latency summary when a game ends and writes
+the histogram to that file on exit.
+"""
+import json
+import math
+import time
+from collections import deque
+
+
+class LatencyHistogram:
+    """Fixed-width latency bins with a single overflow bin; constant memory however many samples."""
+    def __init__(self, bin_ms=1, max_ms=200):
+        self.bin_ms = bin_ms
+        self.counts = [0] * (max_ms // bin_ms + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[min(len(self.counts) - 1, int(ms // self.bin_ms))] += 1
+        self.total += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction):
+        """Upper edge in ms of the bin holding the nearest-rank percentile."""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, (index + 1) * self.bin_ms)
+        return self.max
+
+    def fraction_under(self, ms):
+        """Fraction of samples below ms, counted to whole bins."""
+        if not self.total:
+            return 1.0
+        return sum(self.counts[:int(ms // self.bin_ms)]) / self.total
+
+    def summary(self, frame_ms):
+        return {
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0.0,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+            'frame_ms': frame_ms,
+            'under_one_frame': self.fraction_under(frame_ms),
+        }
+
+    def report(self, frame_ms):
+        stats = self.summary(frame_ms)
+        return (f"input latency: {stats['count']} presses, p50 {stats['p50']:.0f} ms, "
+                f"p95 {stats['p95']:.0f} ms, p99 {stats['p99']:.0f} ms, max {stats['max']:.1f} ms; "
+                f"{stats['under_one_frame']:.1%} under one frame ({frame_ms:.0f} ms)")
+
+    def dump(self, path, frame_ms):
+        """Writes the summary and the non-empty bins to path as JSON."""
+        bins = {f"{index * self.bin_ms}-{(index + 1) * self.bin_ms}": count
+                for index, count in enumerate(self.counts) if count}
+        with open(path, 'w') as f:
+            json.dump({'time_unit': 'ms', 'summary': self.summary(frame_ms), 'bins': bins}, f, indent=2)
+
+
+class InputQueue:
+    """
+    Queues key events for the given keysyms between ticks and hands them to
+    the game in arrival order with drain(). Auto-repeat (a release directly
+    followed by a press of the same key) is dropped, and a key released in
+    the same tick it was pressed is held until the next tick, so a short tap
+    always counts; other keys' events behind it still apply this tick.
+    """
+    def __init__(self, master, keys, max_queued=256):
+        self.master = master
+        self.keys = frozenset(keys)
+        self.events = deque(maxlen=max_queued)  # (timestamp, keysym, pressed)
+        self.held = {}
+        self.in_flight = []  # timestamps of applied presses not yet on screen
+        self.latency = LatencyHistogram()
+
+    def bind(self):
+        self.master.bind('<KeyPress>', self.on_press)
+        self.master.bind('<KeyRelease>', self.on_release)
+
+    def unbind(self):
+        self.master.unbind('<KeyPress>')
+        self.master.unbind('<KeyRelease>')
+
+    def on_press(self, event):
+        if event.keysym in self.keys:
+            self.events.append((time.perf_counter(), event.keysym, True))
+
+    def on_release(self, event):
+        if event.keysym in self.keys:
+            self.events.append((time.perf_counter(), event.keysym, False))
+
+    def clear(self):
+        """Forgets queued events and held keys, e.g. when a new game starts."""
+        self.events.clear()
+        self.held.clear()
+        self.in_flight.clear()
+
+    def drain(self):
+        """Returns the (keysym, pressed) changes to apply this tick, in the order they happened."""
+        events = self.events
+        changes = []
+        pressed_now = set()
+        tapped = set()  # keys whose remaining events wait for the next tick
+        deferred = []
+        while events:
+            event = events.popleft()
+            stamp, keysym, pressed = event
+            if keysym in tapped:
+                deferred.append(event)
+                continue
+            if not pressed:
+                if events and events[0][1] == keysym and events[0][2]:
+                    events.popleft()  # auto-repeat: the key never went up
+                    continue
+                if keysym in pressed_now:
+                    tapped.add(keysym)  # a tap: keep the release for the next tick
+                    deferred.append(event)
+                    continue
+            if self.held.get(keysym, False) == pressed:
+                continue
+            self.held[keysym] = pressed
+            changes.append((keysym, pressed))
+            if pressed:
+                pressed_now.add(keysym)
+                self.in_flight.append(stamp)
+        events.extend(deferred)
+        return changes
+
+    def rendered(self):
+        """Call after each render; the presses it shows are timed once Tk has redrawn."""
+        if self.in_flight:
+            stamps, self.in_flight = self.in_flight, []
+            self.master.after_idle(lambda: self.presented(stamps))
+
+    def presented(self, stamps):
+        now = time.perf_counter()
+        for stamp in stamps:
+            self.latency.add(now - stamp)
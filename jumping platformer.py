@@ -1,12 +1,224 @@
+import hashlib
+import os
+import sys
 import tkinter as tk
-import time
+from array import array
+
+import ghost
+from gameloop import FixedTimestepLoop
+from inputqueue import InputQueue
+from leaderboard import preload, record_result
+from levels import default_level, load_level
+from navgraph import JUMP, load_nav_graph, support
+from profiler import FrameProfiler
+from render import CanvasBatch, HudLabel
+from replay import KEYS, InputRecorder, session_path
+
+class Body:
+    """The player's authoritative position and vertical motion."""
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'vy', 'on_ground')
+
+    def __init__(self, x, y, width, height):
+        self.x1, self.y1, self.x2, self.y2 = x, y, x + width, y + height
+        self.vy = 0
+        self.on_ground = False
+
+    def rect(self):
+        return (self.x1, self.y1, self.x2, self.y2)
+
+    def move(self, dx, dy):
+        self.x1 += dx
+        self.x2 += dx
+        self.y1 += dy
+        self.y2 += dy
+
+
+class EnemyStore:
+    """
+    Array-backed state for the enemies simulated around the player.
+    Each column is a flat array, one slot per live enemy, and removal moves the
+    last slot into the hole, so stepping and collision checks scan dense memory.
+    Enemies are refcounted by the level chunks that hold them, and each one
+    patrols between min_x and max_x at vx pixels per tick (0 for static ones).
+    An enemy released by its last chunk may be kept, unheld, while the game
+    still wants it (a chaser that has followed the player out of its chunk).
+    Chasing enemies also fall and jump: vy is their vertical speed and platform
+    the index of the platform they stand on, or -1 while airborne.
+    """
+    __slots__ = ('ids', 'x1', 'y1', 'x2', 'y2', 'vx', 'vy', 'min_x', 'max_x', 'platform', 'slot_of', 'refs',
+                 'unheld', 'version')
+
+    def __init__(self):
+        self.ids = array('l')
+        self.x1, self.y1, self.x2, self.y2 = array('d'), array('d'), array('d'), array('d')
+        self.vx, self.vy, self.min_x, self.max_x = array('d'), array('d'), array('d'), array('d')
+        self.platform = array('l')
+        self.slot_of = {}  # level enemy index -> slot
+        self.refs = {}     # level enemy index -> number of active chunks holding it
+        self.unheld = set()  # level enemy indexes kept alive with no chunk holding them
+        self.version = 0   # bumped whenever enemies are added or removed
+
+    def __len__(self):
+        return len(self.ids)
+
+    def acquire(self, enemy_id, spawn):
+        """Adds a reference to an enemy, spawning it with spawn(enemy_id) if it is new."""
+        if enemy_id in self.refs:
+            self.refs[enemy_id] += 1
+            self.unheld.discard(enemy_id)
+            return
+        self.refs[enemy_id] = 1
+        rect, vx, min_x, max_x, platform = spawn(enemy_id)
+        self.slot_of[enemy_id] = len(self.ids)
+        self.ids.append(enemy_id)
+        for column, value in zip((self.x1, self.y1, self.x2, self.y2), rect):
+            column.append(value)
+        self.vx.append(vx)
+        self.vy.append(0)
+        self.min_x.append(min_x)
+        self.max_x.append(max_x)
+        self.platform.append(platform)
+        self.version += 1
+
+    def release(self, enemy_id, keep=None):
+        """Drops a reference to an enemy and removes it once nothing holds it, unless keep(slot) is true."""
+        self.refs[enemy_id] -= 1
+        if self.refs[enemy_id]:
+            return
+        if keep is not None and keep(self.slot_of[enemy_id]):
+            self.unheld.add(enemy_id)
+            return
+        self.remove(enemy_id)
+
+    def drop_unheld(self, keep):
+        """Removes the unheld enemies for which keep(slot) is no longer true."""
+        for enemy_id in [enemy_id for enemy_id in self.unheld if not keep(self.slot_of[enemy_id])]:
+            self.unheld.discard(enemy_id)
+            self.remove(enemy_id)
+
+    def remove(self, enemy_id):
+        del self.refs[enemy_id]
+        slot = self.slot_of.pop(enemy_id)
+        last = len(self.ids) - 1
+        columns = (self.ids, self.x1, self.y1, self.x2, self.y2, self.vx, self.vy, self.min_x, self.max_x,
+                   self.platform)
+        if slot != last:
+            for column in columns:
+                column[slot] = column[last]
+            self.slot_of[self.ids[slot]] = slot
+        for column in columns:
+            column.pop()
+        self.version += 1
+
+    def step(self):
+        """Moves every patrolling enemy one tick, turning around at the ends of its beat."""
+        x1, x2, vx = self.x1, self.x2, self.vx
+        for slot in range(len(self.ids)):
+            speed = vx[slot]
+            if not speed:
+                continue
+            x = x1[slot] + speed
+            if x < self.min_x[slot] or x > self.max_x[slot]:
+                x = min(self.max_x[slot], max(self.min_x[slot], x))
+                vx[slot] = -speed
+            x2[slot] += x - x1[slot]
+            x1[slot] = x
+
+    def overlaps(self, rect):
+        """Returns True if any enemy intersects rect."""
+        rx1, ry1, rx2, ry2 = rect
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        for slot in range(len(self.ids)):
+            if rx1 < x2[slot] and rx2 > x1[slot] and ry1 < y2[slot] and ry2 > y1[slot]:
+                return True
+        return False
+
+    def rect(self, slot):
+        return (self.x1[slot], self.y1[slot], self.x2[slot], self.y2[slot])
+
+    def place(self, slot, rect):
+        self.x1[slot], self.y1[slot], self.x2[slot], self.y2[slot] = rect
+
+
+class ChunkedLevelView:
+    """
+    Keeps canvas items only for the platforms in level chunks near the camera.
+    Items are created or taken from a pool when their chunk comes into view,
+    and hidden and returned to the pool when no visible chunk needs them, so
+    the canvas holds a bounded number of items however long the level is.
+    Changes to existing items are queued on a CanvasBatch and sent with the
+    rest of the frame.
+    """
+    def __init__(self, batch, level, color, margin_chunks=1):
+        self.batch = batch
+        self.level = level
+        self.color = color
+        self.margin_chunks = margin_chunks
+        self.clear()
+
+    def clear(self):
+        """Forgets all items; call after the canvas has been wiped."""
+        self.items = {}  # platform index -> [canvas item, chunk refcount]
+        self.pool = []
+        self.active = range(0)
+
+    def update(self, camera_x, view_width):
+        """Materializes the chunks overlapping the view (plus a margin) and releases the rest."""
+        chunk_width = self.level.chunk_width
+        first = max(0, int(camera_x // chunk_width) - self.margin_chunks)
+        last = min(self.level.n_chunks - 1, int((camera_x + view_width) // chunk_width) + self.margin_chunks)
+        wanted = range(first, last + 1)
+        if wanted == self.active:
+            return
+        # Acquire before releasing so platforms spanning both sets are never hidden.
+        for chunk in wanted:
+            if chunk not in self.active:
+                self.acquire(chunk)
+        for chunk in self.active:
+            if chunk not in wanted:
+                self.release(chunk)
+        self.active = wanted
+
+    def acquire(self, chunk):
+        platforms = self.level.platforms
+        for index in self.level.chunk_platforms(chunk):
+            entry = self.items.get(index)
+            if entry:
+                entry[1] += 1
+                continue
+            if self.pool:
+                item = self.pool.pop()
+                self.batch.set_coords(item, *platforms[index])
+                self.batch.configure(item, state='normal')
+            else:
+                item = self.batch.create('rectangle', *platforms[index], fill=self.color, tags="platform")
+            self.items[index] = [item, 1]
+
+    def release(self, chunk):
+        for index in self.level.chunk_platforms(chunk):
+            entry = self.items[index]
+            entry[1] -= 1
+            if not entry[1]:
+                del self.items[index]
+                self.batch.configure(entry[0], state='hidden')
+                self.pool.append(entry[0])
+
+    def item_count(self):
+        return len(self.items) + len(self.pool)
+
 
 class PlatformerGame:
     """
     A simple jumping platformer game that simulates gravity and collisions.
     The game features player movement, platforms, enemies, and a goal.
+    Levels come from levels.Level; collision checks only visit nearby items,
+    and a side-scrolling camera keeps canvas items only for nearby chunks.
+    Physics runs on a Body and an EnemyStore; the canvas is written once per frame.
+    Chasing enemies and the route hint (H) path-find over a navgraph.NavGraph.
+    Runs are timed in simulation ticks and streamed to ghost files; the best
+    finished run on a level is replayed as a translucent ghost.
     """
-    def __init__(self, master):
+    def __init__(self, master, level=None, **constants):
         self.master = master
         self.master.title("Jumping Platformer")
         self.master.geometry("800x600")
@@ -22,14 +234,47 @@ class PlatformerGame:
         self.PLAYER_COLOR = '#FFD700'
         self.GOAL_COLOR = '#FF0000'
         self.ENEMY_COLOR = '#FF5733'
-        self.ENEMY_SIZE = 20
+        self.ENEMY_SIZE = 20  # only sizes the built-in level's enemies; level files give their own
+        self.ENEMY_PATROL_SPEED = 0  # px per tick along the enemy's platform; 0 keeps enemies still
+        self.ENEMY_CHASE_SPEED = 0  # px per tick; above 0 enemies path-find across platforms to the player
+        self.VIEW_WIDTH = 700
+        self.VIEW_HEIGHT = 500
+        self.TICK_RATE = 50
+        # Keyword overrides (e.g. ENEMY_CHASE_SPEED=3) apply before anything is built from them.
+        for name, value in constants.items():
+            if not name.isupper() or not hasattr(self, name):
+                raise AttributeError(f"PlatformerGame has no constant {name!r}")
+            setattr(self, name, value)
 
         # --- Game Variables ---
-        self.player_vel_y = 0
-        self.on_ground = False
+        self.level = level or default_level(self.ENEMY_SIZE)
+        self.custom_level = level is not None
+        self.ranked = False  # set by start_game, so headless runs never reach the leaderboard
+        self.final_item = None  # the game-over text, which show_rank() adds the rank to
+        start_x, start_y = self.level.start
+        self.body = Body(start_x, start_y, self.PLAYER_SIZE, self.PLAYER_SIZE)
+        self.enemy_store = EnemyStore()
+        self.active_enemy_chunks = range(0)
+        self.enemy_items = {}  # level enemy index -> canvas item
+        self.enemy_pool = []
+        self.drawn_enemy_version = -1
+        self.nav = None  # built or loaded from the disk cache on first use
+        self.goal_node = None
+        self.show_route = False
+        self.route_item = None
+        self.drawn_route = None
         self.is_running = False
-        self.start_time = 0
         self.keys_pressed = {}
+        self.tick = 0
+        self.recorder = None
+        self.last_message = None
+        self.camera_x = 0
+        self.ghost_writer = None
+        self.ghost_reader = None
+        self.ghost_item = None
+        self.cached_run_key = None
+        self.loop = FixedTimestepLoop(master, self.update, self.render, tick_rate=self.TICK_RATE)
+        self.input = InputQueue(master, KEYS['platformer'])
 
         # --- UI Components ---
         self.control_frame = tk.Frame(master, bg='#1A2D3E')
@@ -38,89 +283,145 @@ class PlatformerGame:
         self.timer_label = tk.Label(self.control_frame, text="Time: 0.00s",
                                    font=("Arial", 20, "bold"), bg='#1A2D3E', fg='#FFFFFF')
         self.timer_label.pack()
+        self.hud = HudLabel(self.timer_label, "Time: {:.2f}s")
 
-        self.canvas = tk.Canvas(master, width=700, height=500, bg='#4B3F72',
-                                highlightthickness=0, bd=0)
+        self.canvas = tk.Canvas(master, width=self.VIEW_WIDTH, height=self.VIEW_HEIGHT, bg='#4B3F72',
+                                highlightthickness=0, bd=0,
+                                scrollregion=(0, 0, self.level.width, self.VIEW_HEIGHT))
         self.canvas.pack(pady=10)
+        self.batch = CanvasBatch(self.canvas)
 
         # Create game elements
-        self.player = self.canvas.create_oval(
-            50, 450, 50 + self.PLAYER_SIZE, 450 + self.PLAYER_SIZE,
-            fill=self.PLAYER_COLOR, tags="player"
-        )
-        self.platforms = self.create_platforms()
-        self.enemies = self.create_enemies()
+        self.player = self.canvas.create_oval(*self.body.rect(), fill=self.PLAYER_COLOR, tags="player")
+        self.level_view = ChunkedLevelView(self.batch, self.level, self.PLATFORM_COLOR)
         self.goal = self.create_goal()
+        self.update_active_enemies()
+        self.update_camera()
+        self.render_enemies()
+        self.batch.flush()
 
         # Start message
         self.message = self.canvas.create_text(
             350, 250, text="Press ENTER to Start", font=("Arial", 24, "bold"), fill="#FFFFFF"
         )
         self.master.bind('<Return>', self.start_game)
-        self.master.bind('<KeyPress>', self.on_key_press)
-        self.master.bind('<KeyRelease>', self.on_key_release)
-
-    def on_key_press(self, event):
-        """Records which keys are currently being pressed."""
-        self.keys_pressed[event.keysym] = True
-
-    def on_key_release(self, event):
-        """Removes keys from the pressed list when released."""
-        self.keys_pressed[event.keysym] = False
-
-    def create_platforms(self):
-        """Creates the platforms for the level."""
-        platforms = []
-        platforms.append(self.canvas.create_rectangle(0, 480, 700, 500, fill=self.PLATFORM_COLOR)) # ground
-        platforms.append(self.canvas.create_rectangle(150, 400, 250, 420, fill=self.PLATFORM_COLOR))
-        platforms.append(self.canvas.create_rectangle(200, 300, 300, 320, fill=self.PLATFORM_COLOR))
-        platforms.append(self.canvas.create_rectangle(350, 250, 450, 270, fill=self.PLATFORM_COLOR))
-        platforms.append(self.canvas.create_rectangle(500, 200, 600, 220, fill=self.PLATFORM_COLOR))
-        platforms.append(self.canvas.create_rectangle(650, 100, 700, 120, fill=self.PLATFORM_COLOR))
-        return platforms
-
-    def create_enemies(self):
-        """Creates enemies at specific locations."""
-        enemies = []
-        enemies.append(self.canvas.create_rectangle(
-            220, 280, 220 + self.ENEMY_SIZE, 280 + self.ENEMY_SIZE,
-            fill=self.ENEMY_COLOR, tags="enemy"
-        ))
-        enemies.append(self.canvas.create_rectangle(
-            550, 180, 550 + self.ENEMY_SIZE, 180 + self.ENEMY_SIZE,
-            fill=self.ENEMY_COLOR, tags="enemy"
-        ))
-        return enemies
+        # Keys are queued from now on; ones held before the start apply on the first tick.
+        self.input.bind()
+        self.master.bind('<h>', self.toggle_route)
+
+        # Opt-in frame profiler: F3 toggles it and its overlay, GAME_PROFILE=<file>
+        # enables it from startup, and the stats are dumped to that file on exit.
+        self.profiler = FrameProfiler()
+        self.profiler.watch(self, 'handle_input', 'apply_gravity', 'check_collisions', 'check_win', 'check_death')
+        self.profiler.watch(self.loop, 'render')
+        self.profiler.watch_frame(self.loop)
+        self.profiler.count_tk_calls(self.canvas, self.timer_label)
+        self.profiler.attach_overlay(self.canvas)
+        self.master.bind('<F3>', self.profiler.toggle)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        if os.environ.get('GAME_PROFILE'):
+            self.profiler.enable()
+
+    def toggle_route(self, event=None):
+        """Shows or hides the route hint from the player's platform to the goal."""
+        self.show_route = not self.show_route
 
     def create_goal(self):
         """Creates the finish line for the level."""
-        return self.canvas.create_rectangle(660, 50, 690, 100, fill=self.GOAL_COLOR)
+        return self.canvas.create_rectangle(*self.level.goal, fill=self.GOAL_COLOR)
 
     def start_game(self, event=None):
         """Starts the game loop and resets state."""
         if self.is_running:
             return
         self.is_running = True
-        self.start_time = time.time()
+        self.ranked = True
+        preload('platformer')
+        self.tick = 0
         self.canvas.delete(self.message)
+        self.start_ghosts()
+        # GAME_RECORD=<dir> saves every session there for replay.py
+        if os.environ.get('GAME_RECORD'):
+            self.recorder = InputRecorder(session_path(os.environ['GAME_RECORD'], 'platformer'),
+                                          'platformer', 0, self.level)
         self.game_loop()
 
-    def game_loop(self):
-        """The main game loop that updates player position and checks collisions."""
-        if not self.is_running:
+    def run_key(self):
+        """
+        Hashes the whole level and the physics a run's tick count depends on;
+        runs with the same key are comparable. Computed once, on first use.
+        """
+        if self.cached_run_key is None:
+            digest = hashlib.blake2b(self.level.digest(), digest_size=16)
+            digest.update(repr((self.GRAVITY, self.JUMP_STRENGTH, self.PLAYER_SPEED, self.PLAYER_SIZE,
+                                self.TICK_RATE)).encode())
+            self.cached_run_key = digest.hexdigest()
+        return self.cached_run_key
+
+    def board_name(self):
+        """Finish times are ranked per level; custom levels get a board per run key."""
+        return 'platformer:' + self.run_key()[:12] if self.custom_level else 'platformer'
+
+    def start_ghosts(self):
+        """Starts streaming this run to a ghost file and shows the level's best run, if any."""
+        directory = ghost.ghost_dir()
+        if not directory:
             return
+        self.ghost_key = self.run_key()
+        os.makedirs(directory, exist_ok=True)
+        best = ghost.best_path(directory, self.ghost_key)
+        if ghost.finished_ticks(best) is not None:
+            self.ghost_reader = ghost.GhostReader(best)
+            x, y = self.ghost_reader.position
+            self.ghost_item = self.canvas.create_oval(
+                x, y, x + self.PLAYER_SIZE, y + self.PLAYER_SIZE,
+                fill=self.PLAYER_COLOR, outline='', stipple='gray50', tags="ghost"
+            )
+        run_path = os.path.join(directory, f"{self.ghost_key}.run-{os.getpid()}.ghost")
+        self.ghost_writer = ghost.GhostWriter(run_path, self.ghost_key, self.TICK_RATE, self.level.start)
+
+    def stop_ghosts(self, won):
+        """Closes this run's ghost, keeping it if it is the new best, and stops playback."""
+        if self.ghost_writer:
+            self.ghost_writer.close(finished=won)
+            ghost.keep_if_best(self.ghost_writer.path, ghost.best_path(ghost.ghost_dir(), self.ghost_key), won)
+            self.ghost_writer = None
+        if self.ghost_reader:
+            self.ghost_reader.close()
+            self.ghost_reader = None
+        self.ghost_item = None
+
+    def game_loop(self):
+        """Starts the fixed-timestep game loop."""
+        self.loop.start()
 
+    def update(self):
+        """Updates player position and checks collisions for one fixed tick."""
+        self.apply_input()
+        self.tick += 1
         self.handle_input()
         self.apply_gravity()
         self.check_collisions()
-        self.update_timer()
+        self.update_active_enemies()
+        if self.ENEMY_CHASE_SPEED:
+            self.steer_enemies()
+        self.enemy_store.step()
+        if self.ENEMY_CHASE_SPEED:
+            self.settle_enemies()
+        if self.ghost_writer:
+            self.ghost_writer.add(self.body.x1, self.body.y1)
 
         if self.check_win():
             self.end_game("You Win!")
         elif self.check_death():
             self.end_game("Game Over!")
 
-        self.master.after(20, self.game_loop)
+    def apply_input(self):
+        """Applies this tick's queued key changes, recording them first if a recording is running."""
+        for keysym, pressed in self.input.drain():
+            if self.recorder:
+                self.recorder.record(self.tick, keysym, pressed)
+            self.keys_pressed[keysym] = pressed
 
     def handle_input(self):
         """Handles player movement based on pressed keys."""
@@ -129,47 +430,52 @@ class PlatformerGame:
             dx -= self.PLAYER_SPEED
         if self.keys_pressed.get('Right'):
             dx += self.PLAYER_SPEED
-        
-        self.canvas.move(self.player, dx, 0)
+
+        self.body.move(dx, 0)
         self.check_bounds()
-        
-        if self.keys_pressed.get('Up') and self.on_ground:
+
+        if self.keys_pressed.get('Up') and self.body.on_ground:
             self.jump()
 
     def apply_gravity(self):
         """Applies gravity to the player if they are not on the ground."""
-        if not self.on_ground:
-            self.player_vel_y += self.GRAVITY
-            self.canvas.move(self.player, 0, self.player_vel_y)
+        body = self.body
+        if not body.on_ground:
+            body.vy += self.GRAVITY
+            body.move(0, body.vy)
 
     def jump(self):
         """Makes the player jump if they are on the ground."""
-        self.player_vel_y = self.JUMP_STRENGTH
-        self.on_ground = False
-            
+        self.body.vy = self.JUMP_STRENGTH
+        self.body.on_ground = False
+
     def check_bounds(self):
-        """Ensures the player stays within the canvas boundaries."""
-        coords = self.canvas.coords(self.player)
-        if coords[0] < 0:
-            self.canvas.coords(self.player, 0, coords[1], self.PLAYER_SIZE, coords[3])
-        elif coords[2] > 700:
-            self.canvas.coords(self.player, 700 - self.PLAYER_SIZE, coords[1], 700, coords[3])
+        """Ensures the player stays within the level's boundaries."""
+        body = self.body
+        width = self.level.width
+        if body.x1 < 0:
+            body.x1, body.x2 = 0, self.PLAYER_SIZE
+        elif body.x2 > width:
+            body.x1, body.x2 = width - self.PLAYER_SIZE, width
 
     def check_collisions(self):
         """Checks for collisions with platforms and updates the player's vertical velocity."""
-        player_coords = self.canvas.coords(self.player)
-        
+        body = self.body
+        player_coords = body.rect()
+
         # Reset on_ground status
-        self.on_ground = False
-        
-        # Check for collisions with each platform
-        for platform in self.platforms:
-            platform_coords = self.canvas.coords(platform)
-            if self.is_colliding(player_coords, platform_coords) and self.player_vel_y >= 0:
-                self.canvas.coords(self.player, player_coords[0], platform_coords[1] - self.PLAYER_SIZE,
-                                   player_coords[2], platform_coords[1])
-                self.player_vel_y = 0
-                self.on_ground = True
+        body.on_ground = False
+        if body.vy < 0:
+            return
+
+        # Land on the last colliding platform, in level order, near the player
+        platforms = self.level.platforms
+        for index in self.level.platform_index.query(player_coords):
+            platform_coords = platforms[index]
+            if self.is_colliding(player_coords, platform_coords):
+                body.y1, body.y2 = platform_coords[1] - self.PLAYER_SIZE, platform_coords[1]
+                body.vy = 0
+                body.on_ground = True
 
     def is_colliding(self, coords1, coords2):
         """Helper function to check for intersection of two rectangles."""
@@ -179,42 +485,290 @@ class PlatformerGame:
 
     def check_win(self):
         """Checks if the player has reached the goal."""
-        player_coords = self.canvas.coords(self.player)
-        goal_coords = self.canvas.coords(self.goal)
-        return self.is_colliding(player_coords, goal_coords)
+        return self.is_colliding(self.body.rect(), self.level.goal)
 
     def check_death(self):
         """Checks if the player has collided with an enemy."""
-        player_coords = self.canvas.coords(self.player)
-        for enemy in self.enemies:
-            enemy_coords = self.canvas.coords(enemy)
-            if self.is_colliding(player_coords, enemy_coords):
-                return True
-        return False
+        return self.enemy_store.overlaps(self.body.rect())
+
+    def update_active_enemies(self):
+        """
+        Simulates only the enemies in the level chunks around the player.
+        Enemies are spawned by the chunk they start in; a chaser outlives that
+        chunk while it is itself within the active chunks, e.g. on the player's heels.
+        """
+        level = self.level
+        chunk = int((self.body.x1 + self.body.x2) / 2 // level.chunk_width)
+        wanted = range(max(0, chunk - 1), min(level.n_chunks - 1, chunk + 1) + 1)
+        store = self.enemy_store
+        keep = self.enemy_in_view if self.ENEMY_CHASE_SPEED else None
+        if wanted != self.active_enemy_chunks:
+            previous, self.active_enemy_chunks = self.active_enemy_chunks, wanted
+            for chunk in wanted:
+                if chunk not in previous:
+                    for index in level.chunk_enemies(chunk):
+                        store.acquire(index, self.spawn_enemy)
+            for chunk in previous:
+                if chunk not in wanted:
+                    for index in level.chunk_enemies(chunk):
+                        store.release(index, keep)
+        if store.unheld:
+            store.drop_unheld(keep)
+
+    def enemy_in_view(self, slot):
+        """Returns whether the enemy in slot is in one of the active chunks."""
+        store = self.enemy_store
+        return int((store.x1[slot] + store.x2[slot]) / 2 // self.level.chunk_width) in self.active_enemy_chunks
+
+    def spawn_enemy(self, index):
+        """Returns (rect, vx, min_x, max_x, platform) for a level enemy at its starting place."""
+        rect = self.level.enemies[index]
+        x1, y1, x2, y2 = rect
+        platform = support(self.level, rect)
+        if platform is not None and self.level.platforms[platform][1] != y2:
+            platform = None
+        if self.ENEMY_CHASE_SPEED:
+            return rect, 0, 0, self.level.width - (x2 - x1), -1 if platform is None else platform
+        if self.ENEMY_PATROL_SPEED and platform is not None:
+            px1, _, px2, _ = self.level.platforms[platform]
+            return rect, self.ENEMY_PATROL_SPEED, px1, px2 - (x2 - x1), platform
+        return rect, 0, x1, x1, -1 if platform is None else platform
+
+    # --- Navigation ---
+
+    def nav_graph(self):
+        """Returns the level's navigation graph, loading it on first use."""
+        if self.nav is None:
+            self.nav = load_nav_graph(self.level, self.GRAVITY, self.JUMP_STRENGTH, self.PLAYER_SPEED,
+                                      self.PLAYER_SIZE)
+            platform = support(self.level, self.level.goal)
+            if platform is not None:
+                goal_x = (self.level.goal[0] + self.level.goal[2]) / 2
+                self.goal_node = self.nav.node_for(platform, goal_x)
+        return self.nav
+
+    def player_node(self):
+        """Returns the graph node the player stands on or is falling towards, or None."""
+        body = self.body
+        platform = support(self.level, body.rect())
+        if platform is None:
+            return None
+        return self.nav_graph().node_for(platform, (body.x1 + body.x2) / 2)
+
+    def steer_enemies(self):
+        """Points each grounded enemy along its route to the player and jumps where the route does."""
+        nav = self.nav_graph()
+        target = self.player_node()
+        store = self.enemy_store
+        platforms = self.level.platforms
+        speed = self.ENEMY_CHASE_SPEED
+        for slot in range(len(store)):
+            platform = store.platform[slot]
+            if platform < 0:
+                continue  # airborne enemies keep their heading
+            x1, x2 = store.x1[slot], store.x2[slot]
+            center = (x1 + x2) / 2
+            node = nav.node_for(platform, center)
+            goal_x = center
+            hop = None
+            if target == node:
+                goal_x = (self.body.x1 + self.body.x2) / 2
+            elif target is not None:
+                hop = nav.next_hop(node, target)
+                if hop is not None:
+                    goal_x = nav.center(hop)
+            vx = max(-speed, min(speed, goal_x - center))
+            store.vx[slot] = vx
+            if hop is None or nav.edge_kind(node, hop) != JUMP:
+                continue
+            # Take off at the platform edge, or straight up if the next platform is overhead.
+            px1, _, px2, _ = platforms[platform]
+            at_edge = x1 + vx < px1 or x2 + vx > px2
+            overhead = nav.node_x1[hop] < x2 and nav.node_x2[hop] > x1
+            if at_edge or overhead:
+                store.vy[slot] = self.JUMP_STRENGTH
+                store.platform[slot] = -1
+
+    def settle_enemies(self):
+        """Applies gravity to airborne enemies, lands them, and drops those that walked off their platform."""
+        store = self.enemy_store
+        level = self.level
+        platforms = level.platforms
+        for slot in range(len(store)):
+            platform = store.platform[slot]
+            if platform >= 0:
+                px1, _, px2, _ = platforms[platform]
+                if store.x2[slot] > px1 and store.x1[slot] < px2:
+                    continue
+                store.platform[slot] = -1
+            vy = store.vy[slot] + self.GRAVITY
+            store.vy[slot] = vy
+            x1, y1, x2, y2 = store.rect(slot)
+            y1 += vy
+            y2 += vy
+            if y1 > level.height:
+                # Fell out of the level: start over from its spawn point.
+                _, _, _, _, platform = self.spawn_enemy(store.ids[slot])
+                store.place(slot, level.enemies[store.ids[slot]])
+                store.vx[slot] = store.vy[slot] = 0
+                store.platform[slot] = platform
+                continue
+            if vy >= 0:
+                for index in level.platform_index.query((x1, y1, x2, y2)):
+                    if self.is_colliding((x1, y1, x2, y2), platforms[index]):
+                        top = platforms[index][1]
+                        y1, y2 = top - (y2 - y1), top
+                        store.vy[slot] = 0
+                        store.platform[slot] = index
+            store.y1[slot], store.y2[slot] = y1, y2
+
+    def state_hash(self):
+        """Returns a 16-byte digest of the simulation state."""
+        body = self.body
+        store = self.enemy_store
+        enemies = sorted(zip(store.ids, store.x1, store.y1))
+        state = (self.tick, body.rect(), body.vy, body.on_ground, enemies)
+        return hashlib.blake2b(repr(state).encode(), digest_size=16).digest()
+
+    def update_camera(self):
+        """Scrolls the view to follow the player and materializes the chunks around it."""
+        body = self.body
+        max_x = max(0, self.level.width - self.VIEW_WIDTH)
+        camera_x = min(max_x, max(0, int((body.x1 + body.x2) / 2 - self.VIEW_WIDTH / 2)))
+        if camera_x != self.camera_x:
+            self.camera_x = camera_x
+            self.canvas.xview_moveto(camera_x / self.level.width)
+        self.level_view.update(camera_x, self.VIEW_WIDTH)
+
+    def render_enemies(self):
+        """Matches enemy items to the store; moves them only if enemies patrol."""
+        store = self.enemy_store
+        items = self.enemy_items
+        if store.version != self.drawn_enemy_version:
+            for index in [index for index in items if index not in store.slot_of]:
+                item = items.pop(index)
+                self.batch.configure(item, state='hidden')
+                self.enemy_pool.append(item)
+            for slot, index in enumerate(store.ids):
+                if index in items:
+                    continue
+                if self.enemy_pool:
+                    item = self.enemy_pool.pop()
+                    self.batch.set_coords(item, *store.rect(slot))
+                    self.batch.configure(item, state='normal')
+                else:
+                    item = self.batch.create('rectangle', *store.rect(slot), fill=self.ENEMY_COLOR, tags="enemy")
+                items[index] = item
+            self.drawn_enemy_version = store.version
+        if self.ENEMY_PATROL_SPEED or self.ENEMY_CHASE_SPEED:
+            for slot, index in enumerate(store.ids):
+                self.batch.set_coords(items[index], *store.rect(slot))
+
+    def render(self):
+        """Draws one frame from the physics state: player, camera, chunks, enemies and timer."""
+        self.batch.set_coords(self.player, *self.body.rect())
+        self.update_camera()
+        self.render_enemies()
+        self.render_route()
+        if self.ghost_reader:
+            x, y = self.ghost_reader.advance(self.tick)
+            self.batch.set_coords(self.ghost_item, x, y, x + self.PLAYER_SIZE, y + self.PLAYER_SIZE)
+        self.batch.flush()
+        self.update_timer()
+        self.input.rendered()
+
+    def render_route(self):
+        """
+        Draws the route hint as a line over the platform segments; updated only
+        when the route changes, and hidden rather than deleted when there is none.
+        """
+        route = None
+        if self.show_route:
+            start = self.player_node()
+            if start is not None and self.goal_node is not None:
+                route = self.nav.route(start, self.goal_node)
+        if route is self.drawn_route:
+            return
+        self.drawn_route = route
+        if route is None:
+            if self.route_item is not None:
+                self.batch.configure(self.route_item, state='hidden')
+            return
+        nav = self.nav
+        points = []
+        for node in route:
+            points += [nav.center(node), nav.node_top[node] - self.PLAYER_SIZE / 2]
+        goal = self.level.goal
+        points += [(goal[0] + goal[2]) / 2, (goal[1] + goal[3]) / 2]
+        if self.route_item is None:
+            self.route_item = self.batch.create('line', *points, fill=self.PLAYER_COLOR, dash=(4, 4),
+                                                width=2, tags="route")
+        else:
+            self.batch.set_coords(self.route_item, *points)
+            self.batch.configure(self.route_item, state='normal')
+
+    def run_time(self):
+        """Returns the run time in seconds of simulation, exact to the tick whatever the frame rate."""
+        return self.tick / self.TICK_RATE
 
     def update_timer(self):
-        """Updates the timer display."""
-        elapsed_time = time.time() - self.start_time
-        self.timer_label.config(text=f"Time: {elapsed_time:.2f}s")
+        """Updates the timer display; the label is only rewritten when the time shown changes."""
+        self.hud.set(self.run_time())
+        self.hud.flush()
         
     def end_game(self, message):
         """Stops the game and displays the final message."""
         self.is_running = False
+        self.last_message = message
+        self.loop.stop()
+        if self.recorder:
+            self.recorder.close(self.tick, self.state_hash())
+            self.recorder = None
+        won = message == "You Win!"
+        self.stop_ghosts(won=won)
+        pending = record_result(self.board_name(), self.tick) if won and self.ranked else None
+        self.ranked = False
+        self.update_timer()
         self.canvas.delete("all")
-        self.canvas.create_text(
-            self.canvas.winfo_reqwidth() // 2, self.canvas.winfo_reqheight() // 2,
+        self.batch.clear()
+        self.level_view.clear()
+        self.enemy_items.clear()
+        self.enemy_pool.clear()
+        self.route_item = self.drawn_route = None
+        self.final_item = self.canvas.create_text(
+            self.camera_x + self.canvas.winfo_reqwidth() // 2, self.canvas.winfo_reqheight() // 2,
             text=message, font=("Arial", 28, "bold"), fill='#FFD700', justify='center'
         )
+        if pending:
+            self.show_rank(pending, self.final_item, message)
         self.master.unbind('<Return>')
         self.master.unbind('<Left>')
         self.master.unbind('<Right>')
         self.master.unbind('<Up>')
-        self.master.unbind('<KeyPress>')
-        self.master.unbind('<KeyRelease>')
+        self.master.unbind('<h>')
+        self.input.unbind()
+        if os.environ.get('GAME_LATENCY'):
+            print(self.input.latency.report(self.loop.frame_interval * 1000), file=sys.stderr)
+
+    def show_rank(self, pending, item, message):
+        """Adds the player's rank to the final message once the leaderboard has recorded the result."""
+        if not pending.done():
+            self.master.after(50, self.show_rank, pending, item, message)
+        elif pending.result() and item == self.final_item:
+            self.canvas.itemconfigure(item, text=f"{message}\n#{pending.result()} on the leaderboard")
+
+    def on_close(self):
+        """Dumps profiler stats, if any were collected, and closes the window."""
+        self.stop_ghosts(won=False)  # a run abandoned mid-way is not kept
+        self.profiler.dump(os.environ.get('GAME_PROFILE') or 'platformer_profile.json')
+        if os.environ.get('GAME_LATENCY'):
+            self.input.latency.dump(os.environ['GAME_LATENCY'], self.loop.frame_interval * 1000)
+        self.master.destroy()
 
 def main():
     root = tk.Tk()
-    game = PlatformerGame(root)
+    level = load_level(sys.argv[1]) if len(sys.argv) > 1 else None
+    game = PlatformerGame(root, level)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,488 @@
+"""
+Persistent leaderboards shared by both games and the Top Scorer.
+
+Results are appended to one log file, a tab-separated line per change:
+
+    board <TAB> name <TAB> score
+
+and every process that opens the log keeps an in-memory index per board: a
+dict of each player's entry plus the entries in rank order, held as short
+sorted runs. Changing a score is a dict update and a bisect into one run;
+a player's rank is a bisect plus a lookup in a tree of run sizes, and a page
+of the board starting at any rank is found the same way, so both are
+O(log n) and nothing re-sorts the board. refresh() reads only what other
+processes have appended since the last call.
+
+The games write to GAME_LEADERBOARD (default
+~/.local/share/game-leaderboard/leaderboard.log; empty disables) under
+GAME_PLAYER (default: the login name). Space Invaders keeps each player's
+best score, the platformer each player's fastest finish in ticks, and the
+Top Scorer each name's latest score, with ties going to the name entered
+first as they always have. The games record on a background thread and load
+only their own boards, so a long log never holds up the game window.
+
+    python leaderboard.py invaders -k 10
+    python leaderboard.py --compact
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import getpass
+import os
+import sys
+from bisect import bisect_left, insort
+
+try:
+    import fcntl
+except ImportError:  # Windows: compact() carries late lines over without a lock
+    fcntl = None
+
+HIGHER, LOWER = 1, -1
+BOARDS = {'invaders': HIGHER, 'platformer': LOWER, 'scores': HIGHER}  # which way is better
+RUN_SIZE = 512
+BULK_LINES = 1000  # a refresh applying more lines than this rebuilds the boards' order once instead
+OPENED = {}  # (path, family) -> the Leaderboard this process keeps for it, see shared_leaderboard()
+RECORDER = concurrent.futures.ThreadPoolExecutor(max_workers=1)  # the one thread games record results on
+
+
+def leaderboard_path():
+    path = os.environ.get('GAME_LEADERBOARD')
+    if path is None:
+        path = os.path.join(os.path.expanduser('~'), '.local', 'share', 'game-leaderboard', 'leaderboard.log')
+    return path
+
+
+def player_name():
+    name = os.environ.get('GAME_PLAYER')
+    if not name:
+        try:
+            name = getpass.getuser()
+        except Exception:  # no login name in this environment
+            name = 'player'
+    return name
+
+
+def clean_name(name):
+    """Names are one field of a tab-separated line, so tabs and newlines become spaces."""
+    return ' '.join(str(name).split())
+
+
+@contextlib.contextmanager
+def log_lock(path, exclusive=False):
+    """
+    Holds the lock file next to the log: shared while appending, exclusive
+    while compact() swaps the log, so no append lands in a log being replaced.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'ab') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def whole_lines(f, offset):
+    """Returns the complete lines of binary file f from offset on."""
+    f.seek(offset)
+    data = f.read()
+    return data[:data.rfind(b'\n') + 1]
+
+
+class SortedEntries:
+    """
+    A sorted sequence kept as a list of short sorted runs, so an insert or
+    delete shifts one run of at most 2 * RUN_SIZE items instead of the whole
+    list. Looking an item up bisects the runs' last items, then the run. The
+    run sizes are kept in a Fenwick tree, so an item's position and the run
+    holding position i are found in O(log runs) rather than by adding up the
+    runs before it; the tree is rebuilt only when a run is split or emptied.
+    """
+    def __init__(self, items=()):
+        items = sorted(items)
+        self.runs = [items[i:i + RUN_SIZE] for i in range(0, len(items), RUN_SIZE)]
+        self.maxes = [run[-1] for run in self.runs]
+        self.size = len(items)
+        self.rebuild_sizes()
+
+    def __len__(self):
+        return self.size
+
+    # --- Run sizes ---
+
+    def rebuild_sizes(self):
+        """Rebuilds the Fenwick tree of run sizes, 1-based: sizes[i] covers runs (i - lowbit(i), i]."""
+        sizes = [0] * (len(self.runs) + 1)
+        for i, run in enumerate(self.runs, 1):
+            sizes[i] += len(run)
+            parent = i + (i & -i)
+            if parent < len(sizes):
+                sizes[parent] += sizes[i]
+        self.sizes = sizes
+
+    def resize(self, at, change):
+        """Adds change to the size of run at."""
+        i = at + 1
+        while i < len(self.sizes):
+            self.sizes[i] += change
+            i += i & -i
+
+    def before(self, at):
+        """Returns how many items the runs before run at hold."""
+        total = 0
+        while at:
+            total += self.sizes[at]
+            at -= at & -at
+        return total
+
+    def locate(self, position):
+        """Returns (run, offset in it) of items[position]; run is len(runs) past the end."""
+        at = 0
+        step = 1 << (len(self.runs).bit_length() - 1) if self.runs else 0
+        while step:
+            if at + step <= len(self.runs) and self.sizes[at + step] <= position:
+                at += step
+                position -= self.sizes[at]
+            step >>= 1
+        return at, position
+
+    # --- Items ---
+
+    def add(self, item):
+        self.size += 1
+        if not self.runs:
+            self.runs.append([item])
+            self.maxes.append(item)
+            self.rebuild_sizes()
+            return
+        at = min(bisect_left(self.maxes, item), len(self.runs) - 1)
+        run = self.runs[at]
+        insort(run, item)
+        self.maxes[at] = run[-1]
+        if len(run) > 2 * RUN_SIZE:
+            self.runs.insert(at + 1, run[RUN_SIZE:])
+            del run[RUN_SIZE:]
+            self.maxes[at] = run[-1]
+            self.maxes.insert(at + 1, self.runs[at + 1][-1])
+            self.rebuild_sizes()
+        else:
+            self.resize(at, 1)
+
+    def remove(self, item):
+        at = bisect_left(self.maxes, item)
+        run = self.runs[at]
+        del run[bisect_left(run, item)]
+        self.size -= 1
+        if run:
+            self.maxes[at] = run[-1]
+            self.resize(at, -1)
+        else:
+            del self.runs[at]
+            del self.maxes[at]
+            self.rebuild_sizes()
+
+    def index(self, item):
+        """Returns the position of item, or where it would go if it is not present."""
+        at = bisect_left(self.maxes, item)
+        if at == len(self.runs):
+            return self.size
+        return self.before(at) + bisect_left(self.runs[at], item)
+
+    def slice(self, start, stop):
+        """Returns items[start:stop]."""
+        start, stop = max(start, 0), min(stop, self.size)
+        if start >= stop:
+            return []
+        at, offset = self.locate(start)
+        items = []
+        while len(items) < stop - start:
+            items.extend(self.runs[at][offset:offset + stop - start - len(items)])
+            at += 1
+            offset = 0
+        return items
+
+
+class Board:
+    """
+    One ranked board. Entries are (sort key, sequence, name) with the best
+    first in sort order; the sequence number breaks ties in favour of whoever
+    got the score first. The ordered index is built on first use and then
+    kept up to date entry by entry.
+    """
+    def __init__(self, direction=HIGHER):
+        self.direction = direction
+        self.entries = {}  # name -> (sort key, sequence, name)
+        self.index = None  # SortedEntries of every entry, best first; None until needed
+        self.names = None  # SortedEntries of (casefolded name, name), for prefix search; None until needed
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def ordered(self):
+        if self.index is None:
+            self.index = SortedEntries(self.entries.values())
+        return self.index
+
+    def name_index(self):
+        if self.names is None:
+            self.names = SortedEntries((name.casefold(), name) for name in self.entries)
+        return self.names
+
+    def build_indexes(self):
+        """Builds the rank and name indexes now, e.g. on a worker thread, rather than on first use."""
+        self.ordered()
+        self.name_index()
+
+    def invalidate(self):
+        """Drops the indexes, e.g. before applying many results at once; they are rebuilt when next needed."""
+        self.index = None
+        self.names = None
+
+    def score(self, name):
+        entry = self.entries.get(name)
+        return None if entry is None else -entry[0] * self.direction
+
+    def better(self, score, than):
+        return (score - than) * self.direction > 0
+
+    def set(self, name, score, keep_place=False):
+        """
+        Sets name's score; returns False if that was already its score. With
+        keep_place, a name already on the board keeps its tie-break sequence,
+        so ties go to whoever appeared first rather than who scored first.
+        """
+        entry = self.entries.get(name)
+        if entry is not None:
+            if -entry[0] * self.direction == score:
+                return False
+            if self.index is not None:
+                self.index.remove(entry)
+        if entry is None and self.names is not None:
+            self.names.add((name.casefold(), name))
+        if entry is not None and keep_place:
+            sequence = entry[1]
+        else:
+            self.sequence += 1
+            sequence = self.sequence
+        entry = self.entries[name] = (-score * self.direction, sequence, name)
+        if self.index is not None:
+            self.index.add(entry)
+        return True
+
+    def submit(self, name, score):
+        """Keeps score for name if it beats the one on the board; returns whether it did."""
+        current = self.score(name)
+        if current is not None and not self.better(score, current):
+            return False
+        return self.set(name, score)
+
+    def top(self, k=10, start=0):
+        """Returns [(name, score)] for the k entries from rank start + 1 on, best first."""
+        return [(name, -key * self.direction) for key, _, name in self.ordered().slice(start, start + k)]
+
+    def rank(self, name):
+        """Returns name's 1-based rank, or None if it is not on the board."""
+        entry = self.entries.get(name)
+        return None if entry is None else self.ordered().index(entry) + 1
+
+    def prefix_range(self, prefix):
+        """Returns (start, stop): the names starting with prefix, ignoring case, are name_index()[start:stop]."""
+        names = self.name_index()
+        prefix = prefix.casefold()
+        return names.index((prefix,)), names.index((prefix + '\U0010ffff',))
+
+    def matching(self, prefix, start, stop):
+        """Returns names start to stop (exclusive) of those starting with prefix, in case-insensitive order."""
+        low, high = self.prefix_range(prefix)
+        return [name for _, name in self.name_index().slice(low + start, min(high, low + stop))]
+
+
+class Leaderboard:
+    """
+    The boards in one log file, kept up to date with appends from other
+    processes by refresh(). With a family, only that board and its
+    'family:...' variants are loaded, and other boards' lines are skipped.
+    """
+    def __init__(self, path, family=None):
+        self.path = path
+        self.family = family
+        self.boards = {}
+        self.offset = 0  # bytes of the log already applied
+        self.lines = 0
+        self.inode = None  # identity of the file those bytes came from
+        self.refresh()
+
+    def board(self, name):
+        board = self.boards.get(name)
+        if board is None:
+            board = self.boards[name] = Board(BOARDS.get(name.partition(':')[0], HIGHER))
+        return board
+
+    def apply(self, board, name, score):
+        """Applies one result: the Top Scorer's board keeps the latest score, the games' the best."""
+        if board == 'scores':
+            return self.board(board).set(name, score, keep_place=True)
+        return self.board(board).submit(name, score)
+
+    def reset(self):
+        """Forgets everything applied so far; the next refresh reads the log from the start."""
+        self.boards.clear()
+        self.offset = self.lines = 0
+        self.inode = None
+
+    def refresh(self):
+        """
+        Applies lines appended to the log since the last refresh. If the log was
+        replaced (e.g. by --compact in another process) or truncated, the boards
+        are rebuilt from the start of the new file.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                inode = (stat.st_dev, stat.st_ino)
+                if self.offset and (inode != self.inode or stat.st_size < self.offset):
+                    self.reset()
+                self.inode = inode
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            if self.offset:
+                self.reset()
+            return
+        end = data.rfind(b'\n') + 1  # a line still being written is picked up next time
+        lines = data[:end].decode('utf-8', 'replace').splitlines()
+        family = self.family
+        if len(lines) > BULK_LINES:
+            for board in self.boards.values():
+                board.invalidate()
+        for line in lines:
+            fields = line.split('\t')
+            if len(fields) != 3 or (family is not None and fields[0].partition(':')[0] != family):
+                continue
+            try:
+                score = int(fields[2])
+            except ValueError:
+                continue
+            self.apply(fields[0], fields[1], score)
+            self.lines += 1
+        self.offset += end
+
+    def record(self, board, name, score):
+        """Records one result; returns whether it changed the board."""
+        return self.record_many(board, [(name, score)]) > 0
+
+    def record_many(self, board, results):
+        """
+        Appends the (name, score) results that would change the board to the
+        log in a single write, and applies them by reading them back, so every
+        process sees results in log order. Returns how many were written.
+        """
+        self.refresh()
+        target = self.board(board)
+        pending = {}
+        lines = []
+        for name, score in results:
+            name = clean_name(name)
+            current = pending[name] if name in pending else target.score(name)
+            if current == score or (board != 'scores' and current is not None
+                                    and not target.better(score, current)):
+                continue
+            pending[name] = score
+            lines.append(f"{board}\t{name}\t{int(score)}\n")
+        if lines:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with log_lock(self.path), open(self.path, 'ab') as f:
+                f.write(''.join(lines).encode('utf-8'))
+            self.refresh()
+        return len(lines)
+
+    def compact(self):
+        """
+        Rewrites the log with one line per entry, in board order, and swaps it in
+        atomically. Lines other processes appended meanwhile are copied after the
+        entries under the log's exclusive lock, so none land in the old log once
+        copied. (Without fcntl, e.g. on Windows, an append racing the swap itself
+        can still be lost.)
+        """
+        if self.family is not None:
+            raise ValueError("compacting needs every board loaded")
+        self.refresh()
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, 'wb') as f:
+            for name, board in self.boards.items():
+                for player, score in board.top(len(board)):
+                    f.write(f"{name}\t{player}\t{score}\n".encode('utf-8'))
+        with log_lock(self.path, exclusive=True):
+            with open(self.path, 'rb') as log, open(partial, 'ab') as f:
+                f.write(whole_lines(log, self.offset))
+            os.replace(partial, self.path)
+        self.reset()
+        self.refresh()
+
+
+def shared_leaderboard(path, family=None):
+    """
+    Returns this process's Leaderboard for path and family, brought up to date.
+    The log is read in full only the first time; later calls apply just what
+    was appended.
+    """
+    leaderboard = OPENED.get((path, family))
+    if leaderboard is None:
+        leaderboard = OPENED[path, family] = Leaderboard(path, family)
+    else:
+        leaderboard.refresh()
+    return leaderboard
+
+
+def preload(board):
+    """Starts loading the boards of board's family on RECORDER, so recording a result later is quick."""
+    path = leaderboard_path()
+    if path:
+        RECORDER.submit(shared_leaderboard, path, board.partition(':')[0])
+
+
+def record_result(board, score, name=None):
+    """
+    Records a game result under GAME_LEADERBOARD on RECORDER, so a game window
+    never waits on the log. Returns a Future of the player's rank (None if the
+    log could not be written), or None if the leaderboard is disabled.
+    """
+    path = leaderboard_path()
+    if not path:
+        return None
+    return RECORDER.submit(rank_result, path, board, clean_name(name or player_name()), score)
+
+
+def rank_result(path, board, name, score):
+    """RECORDER thread: records one result and returns the player's rank, or None."""
+    try:
+        leaderboard = shared_leaderboard(path, board.partition(':')[0])
+        leaderboard.record(board, name, score)
+    except OSError:
+        return None  # a read-only leaderboard never stops a game from ending
+    return leaderboard.board(board).rank(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or compact the leaderboards.")
+    parser.add_argument('board', nargs='?', help="board to list (default: all)")
+    parser.add_argument('-k', type=int, default=10, help="how many entries to list")
+    parser.add_argument('--compact', action='store_true', help="rewrite the log with one line per entry")
+    args = parser.parse_args(argv)
+
+    leaderboard = Leaderboard(leaderboard_path())
+    if args.compact:
+        lines = leaderboard.lines
+        leaderboard.compact()
+        print(f"compacted {lines} lines to {leaderboard.lines}")
+        return 0
+    for name in [args.board] if args.board else sorted(leaderboard.boards):
+        board = leaderboard.board(name)
+        print(f"{name} ({len(board)} players)")
+        for rank, (player, score) in enumerate(board.top(args.k), 1):
+            print(f"{rank:>4}. {player}: {score}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Level files for the jumping platformer.
+
+A level is a playfield size, the player's start, a goal rectangle, and lists
+of platform and enemy rectangles ([x1, y1, x2, y2]). The level is also cut
+into vertical chunks CHUNK_WIDTH pixels wide, and each chunk lists the
+objects overlapping it, so a renderer can materialize only what is near the
+camera.
+
+Levels load from JSON (.json) or from a compact binary format (anything
+else, conventionally .lvl) of little-endian 32-bit fields:
+
+    header   magic b'PLVL', version, width, height, start x/y, goal x1/y1/x2/y2,
+             platform count, enemy count, chunk width, chunk count
+    body     platform rectangles, then enemy rectangles, 4 int32 each;
+             then for platforms and for enemies: chunk count + 1 uint32
+             offsets followed by the uint32 object indices of each chunk
+
+Version 2 binary files are memory-mapped and decoded on demand (MappedLevel),
+so opening one costs the same whatever its size. Version 1 files, which have
+no chunk tables, are still read into memory.
+
+Every level has a digest, a hash of everything that defines it, which
+identifies it across formats: a level and its binary conversion share one.
+It is computed on first use and then kept.
+
+    python levels.py convert level.json level.lvl
+"""
+import hashlib
+import json
+import mmap
+import random
+import struct
+import sys
+from array import array
+
+MAGIC = b'PLVL'
+VERSION = 2
+HEADER_V1 = struct.Struct('<4sHiiii4iII')
+HEADER = struct.Struct('<4sHiiii4iIIII')
+RECT = struct.Struct('<4i')
+CHUNK_WIDTH = 512
+
+DEFAULT_LEVEL = {
+    'width': 700,
+    'height': 500,
+    'start': [50, 450],
+    'goal': [660, 50, 690, 100],
+    'platforms': [
+        [0, 480, 700, 500],  # ground
+        [150, 400, 250, 420],
+        [200, 300, 300, 320],
+        [350, 250, 450, 270],
+        [500, 200, 600, 220],
+        [650, 100, 700, 120],
+    ],
+    'enemies': [
+        [220, 280, 240, 300],
+        [550, 180, 570, 200],
+    ],
+}
+
+
+def level_hash(level, rect_bytes):
+    """Hashes a level's size, start, goal, object counts and little-endian int32 rectangles."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack('<ii2i4iII', level.width, level.height, *level.start, *level.goal,
+                              len(level.platforms), len(level.enemies)))
+    digest.update(rect_bytes)
+    return digest.digest()
+
+
+class GridIndex:
+    """
+    A static uniform grid over rectangles.
+    Each rectangle is listed in every cell it overlaps, so a query only
+    visits rectangles near the query area, however many the level holds.
+    """
+    def __init__(self, rects, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}  # (col, row) -> ascending list of rect indices
+        for index, rect in enumerate(rects):
+            for cell in self.cell_range(rect):
+                self.cells.setdefault(cell, []).append(index)
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        col1, row1 = int(rect[0] // size), int(rect[1] // size)
+        col2, row2 = int(rect[2] // size), int(rect[3] // size)
+        return [(col, row) for col in range(col1, col2 + 1) for row in range(row1, row2 + 1)]
+
+    def query(self, rect):
+        """Returns the indices of rectangles that may overlap rect, in level order."""
+        cells = self.cells
+        found = set()
+        for cell in self.cell_range(rect):
+            bucket = cells.get(cell)
+            if bucket:
+                found.update(bucket)
+        return sorted(found)
+
+
+def chunk_count(width, chunk_width=CHUNK_WIDTH):
+    return max(1, -(-width // chunk_width))
+
+
+def build_chunks(rects, n_chunks, chunk_width=CHUNK_WIDTH):
+    """Returns, for each chunk, the ascending indices of the rectangles overlapping it."""
+    chunks = [[] for _ in range(n_chunks)]
+    for index, rect in enumerate(rects):
+        first = max(0, int(rect[0] // chunk_width))
+        last = min(n_chunks - 1, int(rect[2] // chunk_width))
+        for chunk in range(first, last + 1):
+            chunks[chunk].append(index)
+    return chunks
+
+
+class Level:
+    """A platformer level held in memory, with spatial indexes over its platforms and enemies."""
+    def __init__(self, width, height, start, goal, platforms, enemies, path=None):
+        self.path = path  # the file it was loaded from, if any
+        self.width = width
+        self.height = height
+        self.start = tuple(start)
+        self.goal = tuple(goal)
+        self.platforms = [tuple(rect) for rect in platforms]
+        self.enemies = [tuple(rect) for rect in enemies]
+        self.platform_index = GridIndex(self.platforms)
+        self.enemy_index = GridIndex(self.enemies)
+        self.chunk_width = CHUNK_WIDTH
+        self.n_chunks = chunk_count(width)
+        self.platform_chunks = build_chunks(self.platforms, self.n_chunks)
+        self.enemy_chunks = build_chunks(self.enemies, self.n_chunks)
+        self.cached_digest = None
+
+    def chunk_platforms(self, chunk):
+        return self.platform_chunks[chunk]
+
+    def chunk_enemies(self, chunk):
+        return self.enemy_chunks[chunk]
+
+    def digest(self):
+        """Returns the level's 16-byte digest."""
+        if self.cached_digest is None:
+            values = array('i', [int(v) for rect in self.platforms + self.enemies for v in rect])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            self.cached_digest = level_hash(self, values.tobytes())
+        return self.cached_digest
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['width'], data['height'], data['start'], data['goal'],
+                   data['platforms'], data['enemies'])
+
+    def to_dict(self):
+        return {'width': self.width, 'height': self.height, 'start': list(self.start),
+                'goal': list(self.goal), 'platforms': [list(rect) for rect in self.platforms],
+                'enemies': [list(rect) for rect in self.enemies]}
+
+
+class RectTable:
+    """A read-only sequence of rectangles decoded from a buffer on access."""
+    def __init__(self, buffer, offset, count):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECT.unpack_from(self.buffer, self.offset + RECT.size * index)
+
+
+class ChunkTable:
+    """Per-chunk object index lists stored as an offsets array plus a members array."""
+    def __init__(self, buffer, offset, n_chunks):
+        self.buffer = buffer
+        self.offsets = offset
+        self.members = offset + 4 * (n_chunks + 1)
+        self.n_chunks = n_chunks
+        self.size = 4 * (n_chunks + 1) + 4 * struct.unpack_from('<I', buffer, offset + 4 * n_chunks)[0]
+
+    def __getitem__(self, chunk):
+        start, end = struct.unpack_from('<2I', self.buffer, self.offsets + 4 * chunk)
+        return struct.unpack_from(f'<{end - start}I', self.buffer, self.members + 4 * start)
+
+
+class ChunkIndex:
+    """Spatial queries answered from a level's chunk table instead of an in-memory grid."""
+    def __init__(self, chunks, chunk_width, n_chunks):
+        self.chunks = chunks
+        self.chunk_width = chunk_width
+        self.n_chunks = n_chunks
+
+    def query(self, rect):
+        """Returns the indices of rectangles in the chunks rect spans, in level order."""
+        first = max(0, int(rect[0] // self.chunk_width))
+        last = min(self.n_chunks - 1, int(rect[2] // self.chunk_width))
+        if first == last:
+            return list(self.chunks[first])
+        found = set()
+        for chunk in range(first, last + 1):
+            found.update(self.chunks[chunk])
+        return sorted(found)
+
+
+class MappedLevel:
+    """
+    A version 2 binary level read in place through mmap.
+    Only the header is parsed up front; rectangles and chunk lists are decoded
+    when asked for, so opening a level costs the same however long it is.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.width, self.height, start_x, start_y, *goal, n_platforms, n_enemies,
+         self.chunk_width, self.n_chunks) = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != 2:
+            raise ValueError(f"{path} is not a version 2 level file")
+        self.start = (start_x, start_y)
+        self.goal = tuple(goal)
+        offset = HEADER.size
+        self.platforms = RectTable(self.map, offset, n_platforms)
+        offset += RECT.size * n_platforms
+        self.enemies = RectTable(self.map, offset, n_enemies)
+        offset += RECT.size * n_enemies
+        self.platform_chunks = ChunkTable(self.map, offset, self.n_chunks)
+        offset += self.platform_chunks.size
+        self.enemy_chunks = ChunkTable(self.map, offset, self.n_chunks)
+        self.platform_index = ChunkIndex(self.platform_chunks, self.chunk_width, self.n_chunks)
+        self.enemy_index = ChunkIndex(self.enemy_chunks, self.chunk_width, self.n_chunks)
+        self.cached_digest = None
+
+    def chunk_platforms(self, chunk):
+        return self.platform_chunks[chunk]
+
+    def chunk_enemies(self, chunk):
+        return self.enemy_chunks[chunk]
+
+    def digest(self):
+        """Returns the level's 16-byte digest, hashing the mapped rectangles in place."""
+        if self.cached_digest is None:
+            rects = self.platforms.offset, self.enemies.offset + RECT.size * len(self.enemies)
+            with memoryview(self.map) as view:
+                self.cached_digest = level_hash(self, view[rects[0]:rects[1]])
+        return self.cached_digest
+
+    def to_dict(self):
+        return {'width': self.width, 'height': self.height, 'start': list(self.start),
+                'goal': list(self.goal), 'platforms': [list(rect) for rect in self.platforms],
+                'enemies': [list(rect) for rect in self.enemies]}
+
+    def close(self):
+        self.map.close()
+
+
+def default_level(enemy_size=20):
+    """The built-in level; enemy_size grows its enemies from their top-left corners."""
+    enemies = [[x, y, x + enemy_size, y + enemy_size] for x, y, _, _ in DEFAULT_LEVEL['enemies']]
+    return Level.from_dict(dict(DEFAULT_LEVEL, enemies=enemies))
+
+
+def load_level(path):
+    """Loads a .json level, memory-maps a version 2 binary level, or reads a version 1 one."""
+    if path.endswith('.json'):
+        with open(path) as f:
+            level = Level.from_dict(json.load(f))
+        level.path = path
+        return level
+    with open(path, 'rb') as f:
+        magic, version = struct.unpack('<4sH', f.read(6))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a level file")
+        if version == 2:
+            return MappedLevel(path)
+        if version != 1:
+            raise ValueError(f"{path} has unsupported level version {version}")
+        f.seek(0)
+        data = f.read()
+    magic, version, width, height, start_x, start_y, *rest = HEADER_V1.unpack_from(data)
+    goal, (n_platforms, n_enemies) = rest[:4], rest[4:]
+    values = array('i')
+    values.frombytes(data[HEADER_V1.size:HEADER_V1.size + 16 * (n_platforms + n_enemies)])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    rects = [values[i:i + 4] for i in range(0, len(values), 4)]
+    return Level(width, height, (start_x, start_y), goal, rects[:n_platforms], rects[n_platforms:], path)
+
+
+def pack_chunks(chunks):
+    """Encodes per-chunk index lists as uint32 offsets followed by uint32 members."""
+    offsets = array('I', [0])
+    members = array('I')
+    for chunk in chunks:
+        members.extend(chunk)
+        offsets.append(len(members))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+        members.byteswap()
+    return offsets.tobytes() + members.tobytes()
+
+
+def save_level(level, path):
+    """Saves a level as JSON if path ends in .json, otherwise in the version 2 binary format."""
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(level.to_dict(), f)
+        return
+    platforms = [tuple(rect) for rect in level.platforms]
+    enemies = [tuple(rect) for rect in level.enemies]
+    n_chunks = chunk_count(level.width)
+    values = array('i', [int(v) for rect in platforms + enemies for v in rect])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, level.width, level.height, *level.start, *level.goal,
+                            len(platforms), len(enemies), CHUNK_WIDTH, n_chunks))
+        f.write(values.tobytes())
+        f.write(pack_chunks(build_chunks(platforms, n_chunks)))
+        f.write(pack_chunks(build_chunks(enemies, n_chunks)))
+
+
+def generate_level(n_platforms, n_enemies=0, seed=0, height=500):
+    """Builds a long random level of reachable steps, for benchmarks and stress tests."""
+    rng = random.Random(seed)
+    platforms = []
+    x = 150
+    for _ in range(n_platforms - 1):
+        y = rng.randrange(250, 430, 10)
+        width = rng.randrange(60, 140, 10)
+        platforms.append([x, y, x + width, y + 20])
+        x += width + rng.randrange(40, 120, 10)
+    width = x + 200
+    platforms.insert(0, [0, height - 20, width, height])  # ground
+    enemies = []
+    for _ in range(n_enemies):
+        step = rng.choice(platforms[1:]) if len(platforms) > 1 else platforms[0]
+        enemies.append([step[0], step[1] - 20, step[0] + 20, step[1]])
+    goal = [width - 40, height - 70, width - 10, height - 20]
+    return Level(width, height, (50, height - 50), goal, platforms, enemies)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] != 'convert':
+        print("usage: python levels.py convert SOURCE DEST", file=sys.stderr)
+        return 2
+    save_level(load_level(argv[1]), argv[2])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
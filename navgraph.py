@@ -0,0 +1,312 @@
+"""
+Jump-reachability navigation graph for platformer levels.
+
+Nodes are platform segments at most SEGMENT_WIDTH pixels wide, so long
+platforms such as the ground become a chain of nodes rather than one node
+that touches everything. An edge A -> B means a body standing on A can reach
+the top of B, either by walking (along the same platform, or off an edge and
+falling) or by jumping, under the game's gravity, jump strength and run speed.
+Edge costs are lower bounds on the ticks the move takes, so A* with the
+horizontal-distance heuristic finds the quickest route.
+
+Building the graph simulates jump arcs against nearby platforms only, once
+per level. The result is cached on disk (GAME_NAV_CACHE, default
+~/.cache/platformer-nav; empty disables) under a hash of the level geometry
+and the physics constants, so later loads only read a file. Route queries
+are memoized.
+
+    python navgraph.py level.json
+"""
+import hashlib
+import heapq
+import os
+import struct
+import sys
+import time
+from array import array
+
+NAV_VERSION = 1
+MAGIC = b'PNAV'
+HEADER = struct.Struct('<4sHII')  # magic, version, node count, edge count
+SEGMENT_WIDTH = 256
+ROUTE_CACHE_SIZE = 4096
+WALK, JUMP = 0, 1
+
+
+def jump_arc(gravity, vy, fall_limit):
+    """Returns (vertical offset, velocity) after each airborne tick, until fall_limit below the start."""
+    arc = []
+    y = 0
+    while y <= fall_limit:
+        vy += gravity
+        y += vy
+        arc.append((y, vy))
+    return arc
+
+
+def landing_tick(arc, rise, depth):
+    """
+    Returns the first tick at which a body following arc lands on a top rise
+    pixels below where it started (negative rise is above), or None if it never
+    gets there or passes through the platform, depth pixels deep, between ticks.
+    """
+    for tick, (y, vy) in enumerate(arc, 1):
+        if vy >= 0 and y >= rise:
+            return tick if y < rise + depth else None
+    return None
+
+
+def support(level, rect):
+    """Returns the index of the platform rect stands on or will fall onto, or None."""
+    x1, _, x2, y2 = rect
+    best = None
+    platforms = level.platforms
+    for index in level.platform_index.query((x1, y2, x2, level.height)):
+        px1, py1, px2, _ = platforms[index]
+        if px1 < x2 and px2 > x1 and py1 >= y2 and (best is None or py1 < platforms[best][1]):
+            best = index
+    return best
+
+
+def level_key(level, gravity, jump_strength, speed, body_size):
+    """Hashes everything the graph depends on: level geometry, physics and graph format."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((NAV_VERSION, SEGMENT_WIDTH, level.width, level.height,
+                        gravity, jump_strength, speed, body_size)).encode())
+    values = array('i', [int(v) for rect in level.platforms for v in rect])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+class NavGraph:
+    """
+    Platform segments and the moves between them, in compressed sparse row form:
+    the edges leaving node n are edge_targets[edge_offsets[n]:edge_offsets[n + 1]].
+    """
+    def __init__(self, first_node, node_x1, node_x2, node_top, edge_offsets, edge_targets, edge_costs,
+                 edge_kinds, speed):
+        self.first_node = first_node  # platform index -> its first node; one extra entry at the end
+        self.node_x1 = node_x1
+        self.node_x2 = node_x2
+        self.node_top = node_top
+        self.edge_offsets = edge_offsets
+        self.edge_targets = edge_targets
+        self.edge_costs = edge_costs
+        self.edge_kinds = edge_kinds
+        self.speed = speed
+        self.routes = {}
+
+    @property
+    def node_count(self):
+        return len(self.node_x1)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_targets)
+
+    def node_for(self, platform, x):
+        """Returns the node of platform under horizontal position x."""
+        first = self.first_node[platform]
+        last = self.first_node[platform + 1] - 1
+        return min(last, max(first, first + int((x - self.node_x1[first]) // SEGMENT_WIDTH)))
+
+    def center(self, node):
+        return (self.node_x1[node] + self.node_x2[node]) / 2
+
+    def edge_kind(self, source, target):
+        """Returns WALK or JUMP for the edge source -> target, or None if there is none."""
+        for edge in range(self.edge_offsets[source], self.edge_offsets[source + 1]):
+            if self.edge_targets[edge] == target:
+                return self.edge_kinds[edge]
+        return None
+
+    def heuristic(self, node, goal):
+        return abs(self.center(node) - self.center(goal)) / self.speed
+
+    def route(self, start, goal):
+        """Returns the quickest node path from start to goal (inclusive), or None if unreachable."""
+        key = (start, goal)
+        if key in self.routes:
+            return self.routes[key]
+        if len(self.routes) >= ROUTE_CACHE_SIZE:
+            self.routes.clear()
+        path = self.routes[key] = self.search(start, goal)
+        return path
+
+    def search(self, start, goal):
+        """A* over the graph; ties break on node number so routes are deterministic."""
+        offsets, targets, costs = self.edge_offsets, self.edge_targets, self.edge_costs
+        best = {start: 0.0}
+        came_from = {}
+        frontier = [(self.heuristic(start, goal), 0.0, start)]
+        while frontier:
+            _, cost, node = heapq.heappop(frontier)
+            if node == goal:
+                path = [node]
+                while node in came_from:
+                    node = came_from[node]
+                    path.append(node)
+                return tuple(reversed(path))
+            if cost > best[node]:
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                target = targets[edge]
+                new_cost = cost + costs[edge]
+                if new_cost < best.get(target, float('inf')):
+                    best[target] = new_cost
+                    came_from[target] = node
+                    heapq.heappush(frontier, (new_cost + self.heuristic(target, goal), new_cost, target))
+        return None
+
+    def next_hop(self, start, goal):
+        """Returns the node after start on the route to goal, or None if there is none."""
+        path = self.route(start, goal)
+        if path and len(path) > 1:
+            return path[1]
+        return None
+
+    @classmethod
+    def build(cls, level, gravity, jump_strength, speed, body_size):
+        """Simulates walk-off and jump arcs from every segment to the platforms within reach."""
+        platforms = level.platforms
+        fall_limit = level.height
+        fall = jump_arc(gravity, 0, fall_limit)
+        jump = jump_arc(gravity, jump_strength, fall_limit)
+        apex = -min(y for y, _ in jump)
+        reach = speed * len(jump) + body_size
+
+        first_node = array('i', [0])
+        node_x1, node_x2, node_top = array('d'), array('d'), array('d')
+        node_platform = array('i')
+        for index in range(len(platforms)):
+            x1, y1, x2, _ = platforms[index]
+            x = x1
+            while True:
+                node_x1.append(x)
+                node_x2.append(min(x2, x + SEGMENT_WIDTH))
+                node_top.append(y1)
+                node_platform.append(index)
+                x += SEGMENT_WIDTH
+                if x >= x2:
+                    break
+            first_node.append(len(node_x1))
+
+        edge_offsets = array('I', [0])
+        edge_targets, edge_costs, edge_kinds = array('I'), array('d'), array('B')
+        for node in range(len(node_x1)):
+            x1, x2, top = node_x1[node], node_x2[node], node_top[node]
+            platform = node_platform[node]
+            edges = {}
+            # Walk to the neighbouring segments of the same platform.
+            for neighbour in (node - 1, node + 1):
+                if first_node[platform] <= neighbour < first_node[platform + 1]:
+                    edges[neighbour] = (abs(node_x1[neighbour] - x1) / speed, WALK)
+            for target_platform in level.platform_index.query((x1 - reach, top - apex, x2 + reach, fall_limit)):
+                if target_platform == platform:
+                    continue
+                tx1, ty1, tx2, ty2 = platforms[target_platform]
+                rise, depth = ty1 - top, ty2 - ty1 + body_size
+                first = first_node[target_platform]
+                last = first_node[target_platform + 1] - 1
+                low = max(first, first + int((x1 - reach - tx1) // SEGMENT_WIDTH))
+                high = min(last, first + int((x2 + reach - tx1) // SEGMENT_WIDTH))
+                for target in range(low, high + 1):
+                    gap = max(0, node_x1[target] - x2, x1 - node_x2[target])
+                    distance = abs(node_x1[target] + node_x2[target] - x1 - x2) / 2 / speed
+                    for kind, arc in ((WALK, fall), (JUMP, jump)):
+                        tick = landing_tick(arc, rise, depth)
+                        if tick is not None and gap < speed * tick + body_size:
+                            edges[target] = (max(tick, distance), kind)
+                            break
+            for target in sorted(edges):
+                cost, kind = edges[target]
+                edge_targets.append(target)
+                edge_costs.append(cost)
+                edge_kinds.append(kind)
+            edge_offsets.append(len(edge_targets))
+        return cls(first_node, node_x1, node_x2, node_top, edge_offsets, edge_targets, edge_costs,
+                   edge_kinds, speed)
+
+    def save(self, path):
+        """Writes the graph to path atomically, so concurrent readers never see half a file."""
+        columns = (self.first_node, self.node_x1, self.node_x2, self.node_top, self.edge_offsets,
+                   self.edge_targets, self.edge_costs, self.edge_kinds)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, NAV_VERSION, self.node_count, self.edge_count))
+            f.write(struct.pack('<I', len(self.first_node)))
+            for column in columns:
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path, speed):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, n_nodes, n_edges = HEADER.unpack_from(data)
+        if magic != MAGIC or version != NAV_VERSION:
+            raise ValueError(f"{path} is not a version {NAV_VERSION} navigation graph")
+        n_first, = struct.unpack_from('<I', data, HEADER.size)
+        offset = HEADER.size + 4
+        columns = []
+        for typecode, count in (('i', n_first), ('d', n_nodes), ('d', n_nodes), ('d', n_nodes),
+                                ('I', n_nodes + 1), ('I', n_edges), ('d', n_edges), ('B', n_edges)):
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += size
+        return cls(*columns, speed)
+
+
+def cache_dir():
+    directory = os.environ.get('GAME_NAV_CACHE')
+    if directory is None:
+        directory = os.path.join(os.path.expanduser('~'), '.cache', 'platformer-nav')
+    return directory
+
+
+def load_nav_graph(level, gravity, jump_strength, speed, body_size):
+    """Returns the level's navigation graph, from the disk cache when it holds a current one."""
+    directory = cache_dir()
+    path = None
+    if directory:
+        path = os.path.join(directory, level_key(level, gravity, jump_strength, speed, body_size) + '.nav')
+        try:
+            return NavGraph.load(path, speed)
+        except (OSError, ValueError, struct.error):
+            pass
+    graph = NavGraph.build(level, gravity, jump_strength, speed, body_size)
+    if path:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            graph.save(path)
+        except OSError:
+            pass  # a read-only cache only costs a rebuild next time
+    return graph
+
+
+def main(argv=None):
+    from levels import load_level
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python navgraph.py LEVEL", file=sys.stderr)
+        return 2
+    level = load_level(argv[0])
+    # The platformer's physics constants.
+    start = time.perf_counter()
+    graph = load_nav_graph(level, gravity=1, jump_strength=-20, speed=8, body_size=20)
+    elapsed = time.perf_counter() - start
+    print(f"{graph.node_count} nodes, {graph.edge_count} edges in {elapsed:.3f} s (cache: {cache_dir() or 'off'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import csv
+import json
+import math
+import os
+import time
+from collections import deque
+
+_MISSING = object()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class FrameProfiler:
+    """
+    Opt-in per-phase frame timings and Tk call counts, with an on-canvas HUD.
+    Phases are registered up front but only wrapped while the profiler is
+    enabled; disabling restores the original methods, so a disabled profiler
+    adds no per-call cost at all.
+    """
+    TK_METHODS = ('coords', 'move', 'delete', 'itemconfigure', 'itemconfig', 'create_rectangle',
+                  'create_oval', 'create_text', 'config', 'configure')
+
+    def __init__(self, window=300, hud_every=10):
+        self.window = window        # samples kept per phase for the rolling percentiles
+        self.hud_every = hud_every  # frames between overlay refreshes
+        self.enabled = False
+        self.phases = []    # (obj, method name, phase name)
+        self.widgets = []
+        self.frame_owner = None
+        self.patched = []   # (obj, name, previous instance attribute or _MISSING)
+        self.samples = {}
+        self.frame_tk_calls = deque(maxlen=window)
+        self.tk_calls = 0
+        self.frames = 0
+        self.overlay_canvas = None
+
+    def watch(self, obj, *names, prefix=''):
+        """Registers methods of obj as timed phases named prefix + method name."""
+        for name in names:
+            self.phases.append((obj, name, prefix + name))
+
+    def watch_frame(self, obj, name='frame'):
+        """Registers the method that runs one whole frame, e.g. FixedTimestepLoop.frame."""
+        self.frame_owner = (obj, name)
+
+    def count_tk_calls(self, *widgets):
+        """Counts calls to the drawing methods of the given Tk widgets."""
+        self.widgets.extend(widgets)
+
+    def attach_overlay(self, canvas):
+        self.overlay_canvas = canvas
+
+    def patch(self, obj, name, wrapper):
+        self.patched.append((obj, name, obj.__dict__.get(name, _MISSING)))
+        setattr(obj, name, wrapper)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for obj, name, phase in self.phases:
+            self.patch(obj, name, self.timed(phase, getattr(obj, name)))
+        for widget in self.widgets:
+            for name in self.TK_METHODS:
+                if hasattr(widget, name):
+                    self.patch(widget, name, self.counted(getattr(widget, name)))
+        if self.frame_owner:
+            obj, name = self.frame_owner
+            self.patch(obj, name, self.framed(getattr(obj, name)))
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for obj, name, previous in reversed(self.patched):
+            if previous is _MISSING:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+        self.patched.clear()
+        if self.overlay_canvas is not None:
+            self.overlay_canvas.delete("perf_hud")
+
+    def toggle(self, event=None):
+        """Key handler: switches profiling and the overlay on or off."""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def timed(self, phase, func):
+        samples = self.samples.setdefault(phase, deque(maxlen=self.window))
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(clock() - start)
+        return wrapper
+
+    def counted(self, func):
+        def wrapper(*args, **kwargs):
+            self.tk_calls += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def framed(self, func):
+        timed_frame = self.timed('frame', func)
+
+        def wrapper(*args, **kwargs):
+            self.tk_calls = 0
+            result = timed_frame(*args, **kwargs)
+            self.frame_tk_calls.append(self.tk_calls)
+            self.frames += 1
+            if self.overlay_canvas is not None and self.frames % self.hud_every == 0:
+                self.draw_overlay()
+            return result
+        return wrapper
+
+    def summary(self):
+        """Returns {phase: stats} with timings in milliseconds, plus Tk calls per frame."""
+        stats = {}
+        for phase, samples in self.samples.items():
+            values = sorted(samples)
+            if not values:
+                continue
+            stats[phase] = {
+                'count': len(values),
+                'mean': sum(values) / len(values) * 1000,
+                'p50': percentile(values, 0.50) * 1000,
+                'p95': percentile(values, 0.95) * 1000,
+                'p99': percentile(values, 0.99) * 1000,
+                'max': values[-1] * 1000,
+            }
+        calls = sorted(self.frame_tk_calls)
+        if calls:
+            stats['tk_calls_per_frame'] = {
+                'count': len(calls),
+                'mean': sum(calls) / len(calls),
+                'p50': percentile(calls, 0.50),
+                'p95': percentile(calls, 0.95),
+                'p99': percentile(calls, 0.99),
+                'max': calls[-1],
+            }
+        return stats
+
+    def draw_overlay(self):
+        """
+        Redraws the HUD text at the top left of the visible area. Uses the
+        unwrapped canvas methods so the overlay is not counted.
+        """
+        canvas = self.overlay_canvas
+        lines = [f"{'phase':<18}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for phase, row in self.summary().items():
+            unit = '' if phase == 'tk_calls_per_frame' else 'ms'
+            lines.append(f"{phase:<18}{row['p50']:>7.2f}{row['p95']:>7.2f}{row['p99']:>7.2f} {unit}")
+        type(canvas).delete(canvas, "perf_hud")
+        type(canvas).create_text(canvas, canvas.canvasx(8), canvas.canvasy(8), text="\n".join(lines), anchor='nw', tags="perf_hud",
+                                 font=("Courier", 9), fill='#FFFFFF')
+
+    def dump(self, path):
+        """Writes the summary to path as CSV if it ends in .csv, otherwise as JSON."""
+        stats = self.summary()
+        if not stats:
+            return
+        if os.path.splitext(path)[1].lower() == '.csv':
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['phase', 'unit', 'count', 'mean', 'p50', 'p95', 'p99', 'max'])
+                for phase, row in stats.items():
+                    unit = 'calls' if phase == 'tk_calls_per_frame' else 'ms'
+                    writer.writerow([phase, unit, row['count'], row['mean'], row['p50'],
+                                     row['p95'], row['p99'], row['max']])
+        else:
+            with open(path, 'w') as f:
+                json.dump({'frames': self.frames, 'time_unit': 'ms', 'phases': stats}, f, indent=2)
@@ -1,71 +1,447 @@
+import queue
+import sys
+import threading
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox, ttk
 
-def find_topper():
-    try:
-        data_str = entry.get()
+from leaderboard import Board, Leaderboard, leaderboard_path, player_name
+from render import CanvasBatch
+from scores import Cancelled, HIGH_SCORE, import_scores, LatestScores, parse_record
+
+class TopScorer:
+    """
+    The Top Scorer window. Entered scores and imported files are analysed on
+    a background thread, so the window keeps redrawing while it works: the
+    thread posts progress and the leader so far to a queue, which the Tk
+    thread polls every POLL_MS, and Cancel stops it at the next chunk. While
+    a job runs the worker owns the leaderboard: the Leaderboards button is
+    disabled and an open leaderboard window is frozen until the job ends.
+    """
+    def __init__(self, master):
+        self.master = master
+        self.master.title("🏆 Top Scorer")
+        self.master.geometry("500x520")
+        self.master.configure(bg="#0A1828")
+
+        # --- Constants ---
+        self.POLL_MS = 16  # about 60 Hz
+        self.ENTRY_CHUNK = 50000  # entered records parsed between progress reports
+
+        # --- State ---
+        # Entered scores go to the shared leaderboard's 'scores' board, or to a board
+        # for this session only when GAME_LEADERBOARD is empty. The log is loaded on
+        # the worker thread once the window is up.
+        self.leaderboard = None
+        self.session_board = Board()
+        self.messages = queue.Queue()  # posted by the worker thread, read by poll()
+        self.cancel = threading.Event()
+        self.worker = None
+        self.board_view = None
+
+        # --- UI Components ---
+        title_frame = tk.Frame(master, bg="#FFD700")
+        title_frame.pack(pady=20, padx=15, fill="x")
+        title_label = tk.Label(title_frame, text="🏆 TOP SCORER", bg="#FFD700", fg="#0A1828",
+                               font=("Arial", 24, "bold"))
+        title_label.pack(ipady=10)
+
+        input_frame = tk.Frame(master, bg="#0A1828")
+        input_frame.pack(pady=10)
+
+        entry_label = tk.Label(input_frame, text="Enter scores (e.g., John:98, Jane:92):",
+                               bg="#0A1828", fg="#FFFFFF", font=("Arial", 12))
+        entry_label.pack(pady=(0, 5))
+
+        self.entry = tk.Entry(input_frame, width=40, font=("Helvetica", 12),
+                              bg="#1A2D3E", fg="#FFFFFF", insertbackground="#FFD700")
+        self.entry.pack(pady=5)
+        self.entry.bind("<Return>", lambda event=None: self.find_topper())
+
+        self.topper_button = tk.Button(master, text="Find Topper", command=self.find_topper,
+                                       bg="#FFD700", fg="#0A1828", font=("Helvetica", 14, "bold"),
+                                       bd=0, relief="flat", activebackground="#E5C100")
+        self.topper_button.pack(pady=(20, 5), ipadx=20, ipady=10)
+
+        self.import_button = tk.Button(master, text="Import File...", command=self.import_file,
+                                       bg="#1A2D3E", fg="#FFD700", font=("Helvetica", 11, "bold"),
+                                       bd=0, relief="flat", activebackground="#243B55")
+        self.import_button.pack(pady=5, ipadx=10, ipady=4)
+
+        self.boards_button = tk.Button(master, text="Leaderboards", command=self.show_leaderboards,
+                                       bg="#1A2D3E", fg="#FFD700", font=("Helvetica", 11, "bold"),
+                                       bd=0, relief="flat", activebackground="#243B55")
+        self.boards_button.pack(pady=5, ipadx=10, ipady=4)
+
+        progress_frame = tk.Frame(master, bg="#0A1828")
+        progress_frame.pack(pady=(10, 0))
+        self.progress = ttk.Progressbar(progress_frame, length=300, maximum=1.0)
+        self.progress.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(progress_frame, text="Cancel", command=self.cancel.set,
+                                       bg="#1A2D3E", fg="#FF5733", font=("Helvetica", 10, "bold"),
+                                       bd=0, relief="flat", activebackground="#243B55", state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        self.result_label = tk.Label(master, text="", bg="#0A1828", fg="#FFFFFF", font=("Arial", 16))
+        self.result_label.pack(pady=(10, 0))
+
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        if leaderboard_path():
+            self.start(self.open_leaderboard, leaderboard_path())
+
+    def show_error(self, text):
+        self.result_label.config(text=text, fg="#FF5733", font=("Helvetica", 12))
+
+    # --- Background work ---
+
+    def start(self, job, *args):
+        """Runs job(*args) on a worker thread; it reports through post_progress() and returns a finish callback."""
+        if self.worker is not None:
+            return
+        self.cancel.clear()
+        for button in (self.topper_button, self.import_button, self.boards_button):
+            button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        if self.board_view is not None and self.board_view.window.winfo_exists():
+            self.board_view.freeze()
+        self.progress['value'] = 0
+        self.result_label.config(text="Working...", fg="#FFFFFF", font=("Arial", 14))
+        self.worker = threading.Thread(target=self.run, args=(job, args), daemon=True)
+        self.worker.start()
+        self.master.after(self.POLL_MS, self.poll)
+
+    def run(self, job, args):
+        """Worker thread: runs job and posts how it ended."""
+        try:
+            self.messages.put(('done', job(*args)))
+        except Cancelled:
+            self.messages.put(('cancelled', None))
+        except Exception as e:
+            self.messages.put(('error', e))
+
+    def post_progress(self, fraction, leader):
+        """Called on the worker thread; only queues the update."""
+        self.messages.put(('progress', (fraction, leader)))
+
+    def poll(self):
+        """Tk thread: applies the worker's latest progress, and its result once it has finished."""
+        latest = None
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind != 'progress':
+                self.finish(kind, payload)
+                return
+            latest = payload
+        if latest:
+            fraction, leader = latest
+            self.progress['value'] = fraction
+            if leader:
+                self.result_label.config(text=f"{fraction:.0%}... leading so far: {leader[0]} ({leader[1]})",
+                                         fg="#FFFFFF", font=("Arial", 14))
+        self.master.after(self.POLL_MS, self.poll)
+
+    def finish(self, kind, payload):
+        self.worker = None
+        for button in (self.topper_button, self.import_button, self.boards_button):
+            button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if self.board_view is not None and self.board_view.window.winfo_exists():
+            self.board_view.thaw()
+        self.progress['value'] = 1.0 if kind == 'done' else 0
+        if kind == 'done':
+            payload()
+        elif kind == 'cancelled':
+            self.result_label.config(text="Cancelled.", fg="#FFFFFF", font=("Arial", 14))
+        elif isinstance(payload, ValueError):
+            self.show_error(f"Error: {payload}. Please use 'Name:Score' format.")
+        elif isinstance(payload, OSError):
+            self.show_error(f"Could not read or save scores: {payload}")
+        else:
+            self.show_error(f"An unexpected error occurred: {payload}")
+
+    # --- Entered scores ---
+
+    def find_topper(self):
+        data_str = self.entry.get()
         if not data_str.strip():
-            result_label.config(text="Please enter at least one score.", fg="#FF5733", font=("Helvetica", 12))
+            self.show_error("Please enter at least one score.")
             return
+        self.start(self.analyse_entry, data_str)
 
-        scores_data = {}
-        for entry_item in data_str.split(','):
-            parts = entry_item.strip().split(':')
-            if len(parts) == 2:
-                name, score_str = parts
-                scores_data[name.strip()] = int(score_str.strip())
+    def analyse_entry(self, data_str):
+        """Worker thread: parses entered scores in chunks, then records them on the 'scores' board."""
+        items = data_str.split(',')
+        records = []
+        latest = LatestScores()
+        for start in range(0, len(items), self.ENTRY_CHUNK):
+            if self.cancel.is_set():
+                raise Cancelled
+            chunk = [parse_record(entry_item) for entry_item in items[start:start + self.ENTRY_CHUNK]]
+            records.extend(chunk)
+            latest.add((position, name.encode(), score) for position, (name, score) in enumerate(chunk, start))
+            self.post_progress(min(1.0, (start + self.ENTRY_CHUNK) / len(items)), latest.leader())
+        if not records:
+            raise ValueError("No valid entries found")
+        if self.cancel.is_set():
+            raise Cancelled
+        leader = latest.leader()
+        board = self.record_scores(records)
+        return lambda: self.show_topper(leader, board.top(1)[0], board is not self.session_board)
+
+    def record_scores(self, records):
+        """
+        Applies (name, score) records, a name's latest score winning, and returns
+        the board. If the leaderboard cannot be written they go to the session board.
+        """
+        if self.leaderboard is not None:
+            try:
+                self.leaderboard.record_many('scores', records)
+            except OSError:
+                pass  # as in the games, an unwritable leaderboard never stops a lookup
             else:
-                raise ValueError("Incorrect format")
+                board = self.leaderboard.board('scores')
+                board.build_indexes()  # here rather than when the leaderboard window next opens
+                return board
+        for name, score in records:
+            self.session_board.set(name, score, keep_place=True)
+        return self.session_board
 
-        if not scores_data:
-            raise ValueError("No valid entries found")
+    def show_topper(self, leader, board_leader, all_time):
+        """Shows the entered scores' leader, and the board's leader under it when that is someone else."""
+        top_scorer, highest_score = leader
+        if highest_score > HIGH_SCORE:
+            text = f"Highest Score > 95 by {top_scorer} 🏆"
+            style = dict(fg="#FFD700", font=("Arial", 16, "bold"))
+        else:
+            text = f"Highest Score: {highest_score} by {top_scorer}"
+            style = dict(fg="#FFFFFF", font=("Arial", 16))
+        if board_leader != leader:
+            text += f"\n{'All-time' if all_time else 'Session'} leader: {board_leader[0]} ({board_leader[1]})"
+        self.result_label.config(text=text, **style)
 
-        top_scorer = max(scores_data, key=scores_data.get)
-        highest_score = scores_data[top_scorer]
+    # --- Imported files ---
 
-        if highest_score > 95:
-            result_label.config(text=f"Highest Score > 95 by {top_scorer} 🏆",
-                                fg="#FFD700", font=("Arial", 16, "bold"))
+    def import_file(self):
+        """Reads a Name:Score file, one record per line, and shows its top scorer and totals."""
+        path = filedialog.askopenfilename(title="Import scores",
+                                          filetypes=[("Score files", "*.txt *.csv"), ("All files", "*")])
+        if path:
+            self.start(self.analyse_file, path)
+
+    def analyse_file(self, path):
+        """Worker thread: imports a score file, reporting progress as it goes."""
+        report = import_scores(path, progress=self.post_progress, cancel=self.cancel)
+        return lambda: self.show_report(report)
+
+    def show_report(self, report):
+        if not report.count:
+            self.show_error("No valid entries found in file.")
         else:
-            result_label.config(text=f"Highest Score: {highest_score} by {top_scorer}",
-                                fg="#FFFFFF", font=("Arial", 16))
-
-    except ValueError as e:
-        result_label.config(text=f"Error: {e}. Please use 'Name:Score' format.",
-                            fg="#FF5733", font=("Helvetica", 12))
-    except Exception as e:
-        result_label.config(text=f"An unexpected error occurred: {e}",
-                            fg="#FF5733", font=("Helvetica", 12))
-
-root = tk.Tk()
-root.title("🏆 Top Scorer")
-root.geometry("500x350")
-root.configure(bg="#0A1828")
-
-title_frame = tk.Frame(root, bg="#FFD700")
-title_frame.pack(pady=20, padx=15, fill="x")
-title_label = tk.Label(title_frame, text="🏆 TOP SCORER", bg="#FFD700", fg="#0A1828",
-                       font=("Arial", 24, "bold"))
-title_label.pack(ipady=10)
-
-input_frame = tk.Frame(root, bg="#0A1828")
-input_frame.pack(pady=10)
-
-entry_label = tk.Label(input_frame, text="Enter scores (e.g., John:98, Jane:92):",
-                       bg="#0A1828", fg="#FFFFFF", font=("Arial", 12))
-entry_label.pack(pady=(0, 5))
-
-entry = tk.Entry(input_frame, width=40, font=("Helvetica", 12),
-                 bg="#1A2D3E", fg="#FFFFFF", insertbackground="#FFD700")
-entry.pack(pady=5)
-entry.bind("<Return>", lambda event=None: find_topper())
-
-topper_button = tk.Button(root, text="Find Topper", command=find_topper,
-                          bg="#FFD700", fg="#0A1828", font=("Helvetica", 14, "bold"),
-                          bd=0, relief="flat", activebackground="#E5C100")
-topper_button.pack(pady=20, ipadx=20, ipady=10)
-
-result_label = tk.Label(root, text="", bg="#0A1828", fg="#FFFFFF", font=("Arial", 16))
-result_label.pack(pady=(10, 0))
-
-root.mainloop()
+            top_scorer, highest_score = report.leader()
+            self.result_label.config(
+                text=(f"Highest Score: {highest_score} by {top_scorer}\n"
+                      f"{report.count} players, mean {report.mean:.1f}, {report.high} above {HIGH_SCORE}"),
+                fg="#FFD700" if highest_score > HIGH_SCORE else "#FFFFFF", font=("Arial", 14, "bold"))
+        if report.errors.count:
+            shown = "\n".join(f"Line {line_no}: {reason}" for line_no, reason in report.errors.lines[:10])
+            more = report.errors.count - min(10, len(report.errors.lines))
+            messagebox.showwarning("Malformed lines",
+                                   f"{report.errors.count} malformed lines were skipped:\n{shown}"
+                                   + (f"\n...and {more} more" if more else ""))
+
+    # --- Leaderboards ---
+
+    def open_leaderboard(self, path):
+        """Worker thread: loads the leaderboard and builds every board's indexes, so views open at once."""
+        leaderboard = Leaderboard(path)
+        for board in leaderboard.boards.values():
+            board.build_indexes()
+
+        def opened():
+            self.leaderboard = leaderboard
+            self.result_label.config(text="")
+        return opened
+
+    def show_leaderboards(self):
+        """Opens the scrollable leaderboard window, or brings it to the front."""
+        if self.leaderboard is None:
+            messagebox.showinfo("Leaderboards", "The leaderboard is disabled (GAME_LEADERBOARD is empty)."
+                                if not leaderboard_path() else "The leaderboard could not be loaded.")
+            return
+        self.leaderboard.refresh()
+        if not self.leaderboard.boards:
+            messagebox.showinfo("Leaderboards", "No results yet. Finish a game to get on the board!")
+            return
+        if self.board_view is not None and self.board_view.window.winfo_exists():
+            self.board_view.select(self.board_view.board_name.get())
+            self.board_view.window.lift()
+            return
+        self.board_view = LeaderboardView(self.master, self.leaderboard)
+
+    def on_close(self):
+        """Stops any analysis at its next chunk and closes the window."""
+        self.cancel.set()
+        self.master.destroy()
+
+class LeaderboardView:
+    """
+    One board of the leaderboard, ranked, in its own window. Only the rows
+    that fit are drawn: a fixed set of canvas text items is refilled from the
+    board's rank order as the list scrolls, so opening and scrolling cost the
+    same for ten players as for a million. Typing in the search box narrows
+    the list to names starting with the text, read from the board's name
+    index in alphabetical order. The Top Scorer freezes the view while its
+    worker thread may be writing to the leaderboard.
+    """
+    def __init__(self, master, leaderboard):
+        self.leaderboard = leaderboard
+        self.window = tk.Toplevel(master)
+        self.window.title("🏆 Leaderboards")
+        self.window.configure(bg="#0A1828")
+        self.window.resizable(False, False)
+
+        # --- Constants ---
+        self.ROW_HEIGHT = 22
+        self.VISIBLE_ROWS = 20
+        self.WIDTH = 400
+        self.WHEEL_ROWS = 3
+
+        # --- State ---
+        self.board = None
+        self.prefix = ''
+        self.count = 0  # rows in the list: the board, or the names matching prefix
+        self.first = 0  # index of the top visible row
+        self.frozen = False  # True while a worker thread may be changing the leaderboard
+        self.me = player_name()
+
+        # --- UI Components ---
+        controls = tk.Frame(self.window, bg="#0A1828")
+        controls.pack(pady=10, padx=10, fill="x")
+        self.board_name = tk.StringVar(self.window)
+        names = sorted(leaderboard.boards)
+        board_menu = tk.OptionMenu(controls, self.board_name, *names, command=self.select)
+        board_menu.config(bg="#1A2D3E", fg="#FFD700", font=("Helvetica", 11, "bold"),
+                          bd=0, relief="flat", activebackground="#243B55", highlightthickness=0)
+        board_menu.pack(side="left")
+        self.search = tk.StringVar(self.window)
+        search_entry = tk.Entry(controls, textvariable=self.search, width=18, font=("Helvetica", 12),
+                                bg="#1A2D3E", fg="#FFFFFF", insertbackground="#FFD700")
+        search_entry.pack(side="right")
+        tk.Label(controls, text="Search:", bg="#0A1828", fg="#FFFFFF",
+                 font=("Arial", 11)).pack(side="right", padx=5)
+        self.search.trace_add('write', lambda *args: self.filter(self.search.get()))
+
+        list_frame = tk.Frame(self.window, bg="#0A1828")
+        list_frame.pack(padx=10, pady=(0, 5))
+        self.canvas = tk.Canvas(list_frame, width=self.WIDTH, height=self.ROW_HEIGHT * self.VISIBLE_ROWS,
+                                bg="#0A1828", highlightthickness=0)
+        self.canvas.pack(side="left")
+        self.scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.status = tk.Label(self.window, text="", bg="#0A1828", fg="#FFFFFF", font=("Arial", 11))
+        self.status.pack(pady=(0, 10))
+
+        self.batch = CanvasBatch(self.canvas)
+        self.rows = []  # (rank, name, score) text items, one per visible row
+        for row in range(self.VISIBLE_ROWS):
+            y = row * self.ROW_HEIGHT + self.ROW_HEIGHT // 2
+            self.rows.append((
+                self.canvas.create_text(50, y, anchor="e", fill="#FFFFFF", font=("Helvetica", 11)),
+                self.canvas.create_text(65, y, anchor="w", fill="#FFFFFF", font=("Helvetica", 11)),
+                self.canvas.create_text(self.WIDTH - 10, y, anchor="e", fill="#FFFFFF", font=("Helvetica", 11)),
+            ))
+
+        # Bound on the window, so they also reach it through every widget inside.
+        self.window.bind("<MouseWheel>", lambda event: self.scroll_to(
+            self.first - self.WHEEL_ROWS * (1 if event.delta > 0 else -1)))
+        self.window.bind("<Button-4>", lambda event: self.scroll_to(self.first - self.WHEEL_ROWS))
+        self.window.bind("<Button-5>", lambda event: self.scroll_to(self.first + self.WHEEL_ROWS))
+        self.window.bind("<Prior>", lambda event: self.scroll_to(self.first - self.VISIBLE_ROWS))
+        self.window.bind("<Next>", lambda event: self.scroll_to(self.first + self.VISIBLE_ROWS))
+
+        self.board_name.set(names[0])
+        self.select(names[0])
+        search_entry.focus_set()
+
+    def freeze(self):
+        """Stops reading the leaderboard until thaw(); scrolling, searching and switching boards wait."""
+        self.frozen = True
+        self.status.config(text="Updating...")
+
+    def thaw(self):
+        """Reads the leaderboard again, showing whatever changed while frozen."""
+        self.frozen = False
+        self.select(self.board_name.get())
+
+    def select(self, name):
+        """Shows board name, picking up results other processes have added since."""
+        if self.frozen:
+            return
+        self.leaderboard.refresh()
+        self.board = self.leaderboard.board(name)
+        self.filter(self.search.get())
+
+    def filter(self, prefix):
+        if self.frozen:
+            return
+        self.prefix = prefix.strip()
+        if self.prefix:
+            start, stop = self.board.prefix_range(self.prefix)
+            self.count = stop - start
+        else:
+            self.count = len(self.board)
+        self.status.config(text=f"{self.count} of {len(self.board)} players"
+                                + (f" starting with '{self.prefix}'" if self.prefix else ""))
+        self.scroll_to(0)
+
+    def visible(self):
+        """Returns (rank, name, score) for the rows in view."""
+        board = self.board
+        if not self.prefix:
+            return [(self.first + row + 1, name, score)
+                    for row, (name, score) in enumerate(board.top(self.VISIBLE_ROWS, self.first))]
+        return [(board.rank(name), name, board.score(name))
+                for name in board.matching(self.prefix, self.first, self.first + self.VISIBLE_ROWS)]
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.count))
+        elif unit == 'pages':
+            self.scroll_to(self.first + int(amount) * self.VISIBLE_ROWS)
+        else:
+            self.scroll_to(self.first + int(amount))
+
+    def scroll_to(self, first):
+        if self.frozen:
+            return
+        self.first = max(0, min(first, self.count - self.VISIBLE_ROWS))
+        self.draw()
+
+    def draw(self):
+        rows = self.visible()
+        for slot, items in enumerate(self.rows):
+            if slot < len(rows):
+                rank, name, score = rows[slot]
+                texts = (f"{rank}.", name, str(score))
+                color = "#FFD700" if name == self.me else "#FFFFFF"
+            else:
+                texts = ('', '', '')
+                color = "#FFFFFF"
+            for item, text in zip(items, texts):
+                self.batch.configure(item, text=text, fill=color)
+        self.batch.flush()
+        if self.count:
+            self.scrollbar.set(self.first / self.count, min(1.0, (self.first + self.VISIBLE_ROWS) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+def main():
+    root = tk.Tk()
+    TopScorer(root)
+    root.mainloop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Dirty-tracked drawing helpers shared by both games.
+
+Tk calls dominate frame cost, so renderers queue their writes here while a
+frame is built and flush() sends each one at most once, and only if it
+changes what is on screen.
+"""
+
+_MISSING = object()
+
+
+class HudLabel:
+    """
+    A label showing fmt.format(*values). set() only stores the values; flush()
+    formats and configures the widget, once, and only if they changed.
+    """
+    def __init__(self, widget, fmt):
+        self.widget = widget
+        self.fmt = fmt
+        self.values = None
+        self.shown = None
+
+    def set(self, *values):
+        self.values = values
+
+    def flush(self):
+        if self.values != self.shown:
+            self.widget.config(text=self.fmt.format(*self.values))
+            self.shown = self.values
+
+
+class CanvasBatch:
+    """
+    Canvas writes collected over a frame and applied in as few Tk calls as
+    possible: moves of the same item or tag add up into one call, coords
+    writes (absolute, so they win over moves) are skipped when the item
+    already has those coordinates, option changes are merged per item and
+    skipped when the item already has them, and all deletes go out in a
+    single call.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.moves = {}    # item or tag -> [dx, dy]
+        self.coords = {}   # item -> coords tuple
+        self.options = {}  # item -> {option: value}
+        self.deleted = []
+        self.drawn_coords = {}
+        self.drawn_options = {}
+
+    def create(self, kind, *coords, **options):
+        """Creates a canvas item right away, since Tk has to hand back its id, and records what it drew."""
+        item = getattr(self.canvas, 'create_' + kind)(*coords, **options)
+        self.drawn_coords[item] = coords
+        options.pop('tags', None)
+        self.drawn_options[item] = {'state': 'normal', **options}
+        return item
+
+    def move(self, tag_or_id, dx, dy):
+        delta = self.moves.setdefault(tag_or_id, [0, 0])
+        delta[0] += dx
+        delta[1] += dy
+
+    def set_coords(self, item, *coords, track=True):
+        """Queues absolute coordinates. Pass track=False for items that tag moves shift,
+        whose drawn position the batch cannot follow."""
+        self.coords[item] = coords
+        if not track:
+            self.drawn_coords[item] = None
+
+    def configure(self, item, **options):
+        self.options.setdefault(item, {}).update(options)
+
+    def delete(self, item):
+        self.deleted.append(item)
+        self.moves.pop(item, None)
+        self.coords.pop(item, None)
+        self.options.pop(item, None)
+        self.drawn_coords.pop(item, None)
+        self.drawn_options.pop(item, None)
+
+    def flush(self):
+        canvas = self.canvas
+        if self.deleted:
+            canvas.delete(*self.deleted)
+            self.deleted = []
+        drawn_coords = self.drawn_coords
+        for target, (dx, dy) in self.moves.items():
+            if dx or dy:
+                canvas.move(target, dx, dy)
+                drawn = drawn_coords.get(target)
+                if drawn is not None:
+                    drawn_coords[target] = tuple(v + (dx if i % 2 == 0 else dy) for i, v in enumerate(drawn))
+        self.moves.clear()
+        for item, coords in self.coords.items():
+            drawn = drawn_coords.get(item, ())
+            if drawn != coords:
+                canvas.coords(item, *coords)
+                if drawn is not None:
+                    drawn_coords[item] = coords
+        self.coords.clear()
+        drawn_options = self.drawn_options
+        for item, options in self.options.items():
+            drawn = drawn_options.setdefault(item, {})
+            changed = {name: value for name, value in options.items() if drawn.get(name, _MISSING) != value}
+            if changed:
+                canvas.itemconfigure(item, **changed)
+                drawn.update(changed)
+        self.options.clear()
+
+    def clear(self):
+        """Forgets everything, queued or drawn; call after the canvas has been wiped."""
+        self.moves.clear()
+        self.coords.clear()
+        self.options.clear()
+        self.deleted = []
+        self.drawn_coords.clear()
+        self.drawn_options.clear()
@@ -0,0 +1,235 @@
+"""
+Deterministic input recording and headless replay for both games.
+
+A recording is an append-only binary file: a fixed header with the game and
+RNG seed (for the platformer, followed by the level's digest and the path it
+was loaded from, empty for the built-in level), then one record per input event (a varint tick delta and a one-byte
+key code), then an end record carrying the final tick and a hash of the final
+game state. Replaying re-runs the session headless at full speed and checks
+that it ends in the same state.
+
+    GAME_RECORD=sessions python "space invader.py"
+    python replay.py sessions/invaders-20261018-120000.rpl --profile replay_profile.json
+    python replay.py sessions/platformer-20261018-120500.rpl --level moved/level.lvl
+"""
+import argparse
+import importlib
+import os
+import struct
+import sys
+import time
+
+MAGIC = b'GRPL'
+# Version 1 Space Invaders recordings hold key presses only, each a single move or shot;
+# platformer recordings before version 3 do not name their level and replay on the built-in one.
+VERSION = 3
+HEADER = struct.Struct('<4sBBQ')  # magic, version, game code, seed
+LEVEL_HEADER = struct.Struct('<16sH')  # level digest, path length; the UTF-8 path follows
+GAME_CODES = {'invaders': 1, 'platformer': 2}
+GAME_NAMES = {code: name for name, code in GAME_CODES.items()}
+KEYS = {
+    'invaders': ('Left', 'Right', 'space'),
+    'platformer': ('Left', 'Right', 'Up'),
+}
+RELEASE = 0x80
+END = 0xFF
+HASH_SIZE = 16
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def read_varint(f):
+    value = shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise EOFError
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def session_path(directory, game):
+    """Returns a fresh timestamped recording path in directory."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f"{game}-{stamp}.rpl")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(directory, f"{game}-{stamp}-{n}.rpl")
+    return path
+
+
+class InputRecorder:
+    """Appends tick-indexed key events for one game session to a recording file."""
+    def __init__(self, path, game, seed, level=None):
+        self.path = path
+        self.keys = KEYS[game]
+        self.last_tick = 0
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, GAME_CODES[game], seed))
+        if game == 'platformer':
+            level_path = os.path.abspath(level.path).encode('utf-8') if level.path else b''
+            self.file.write(LEVEL_HEADER.pack(level.digest(), len(level_path)) + level_path)
+
+    def record(self, tick, keysym, pressed=True):
+        """Records a key event applied before simulation tick `tick` runs."""
+        if keysym not in self.keys or self.file is None:
+            return
+        code = self.keys.index(keysym) | (0 if pressed else RELEASE)
+        self.file.write(encode_varint(tick - self.last_tick) + bytes((code,)))
+        self.last_tick = tick
+
+    def close(self, tick, state_hash):
+        """Writes the end record with the final tick and state hash."""
+        if self.file is None:
+            return
+        self.file.write(encode_varint(tick - self.last_tick) + bytes((END,)) + state_hash)
+        self.file.close()
+        self.file = None
+
+
+class Recording:
+    """Reads a recording lazily, so arbitrarily long sessions stream from disk."""
+    def __init__(self, path):
+        self.path = path
+        self.level_digest = None
+        self.level_path = None
+        with open(path, 'rb') as f:
+            magic, version, game_code, self.seed = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or not 1 <= version <= VERSION:
+                raise ValueError(f"{path} is not a version 1 to {VERSION} recording")
+            self.version = version
+            self.game = GAME_NAMES[game_code]
+            if self.game == 'platformer' and version >= 3:
+                self.level_digest, length = LEVEL_HEADER.unpack(f.read(LEVEL_HEADER.size))
+                self.level_path = f.read(length).decode('utf-8')
+            self.body_offset = f.tell()
+        self.keys = KEYS[self.game]
+        self.final_tick = None
+        self.final_hash = None
+
+    def events(self):
+        """Yields (tick, keysym, pressed); sets final_tick/final_hash on reaching the end record."""
+        with open(self.path, 'rb') as f:
+            f.seek(self.body_offset)
+            tick = 0
+            while True:
+                try:
+                    tick += read_varint(f)
+                except EOFError:
+                    return  # the session was cut off before it ended
+                code = f.read(1)
+                if not code:
+                    return
+                if code[0] == END:
+                    self.final_tick = tick
+                    self.final_hash = f.read(HASH_SIZE)
+                    return
+                yield tick, self.keys[code[0] & ~RELEASE], not code[0] & RELEASE
+
+
+def replay_invaders(recording, profiler=None):
+    """Re-runs a Space Invaders session on a bare InvadersWorld."""
+    invaders = importlib.import_module("space invader")
+    world = invaders.InvadersWorld(seed=recording.seed)
+    if profiler:
+        profiler.watch(world, 'move_bullets', 'move_enemies', 'check_collisions', 'step')
+        profiler.enable()
+    for tick, keysym, pressed in recording.events():
+        while world.tick < tick and not world.game_over:
+            world.step()
+        if recording.version == 1:
+            world.apply_key(keysym)
+        else:
+            world.set_key(keysym, pressed)
+    while recording.final_tick is not None and world.tick < recording.final_tick and not world.game_over:
+        world.step()
+    return world.tick, world.state_hash()
+
+
+def recorded_level(recording, level_path=None):
+    """
+    Loads the level a platformer session was played on, from level_path if
+    given, and checks it is the same level; raises ValueError if it is not.
+    """
+    from levels import default_level, load_level
+    level_path = level_path or recording.level_path
+    level = load_level(level_path) if level_path else default_level()
+    if recording.level_digest is not None and level.digest() != recording.level_digest:
+        raise ValueError(f"{level_path or 'the built-in level'} is not the level this session was played on")
+    return level
+
+
+def replay_platformer(recording, profiler=None, level_path=None):
+    """Re-runs a platformer session on a stub canvas, on the level it was recorded on."""
+    from headless import make_game
+    platformer = importlib.import_module("jumping platformer")
+    game, _ = make_game(platformer, 'PlatformerGame', False, recorded_level(recording, level_path))
+    game.is_running = True
+    if profiler:
+        profiler.watch(game, 'handle_input', 'apply_gravity', 'check_collisions', 'check_win',
+                       'check_death', 'update')
+        profiler.enable()
+    for tick, keysym, pressed in recording.events():
+        while game.tick < tick and game.is_running:
+            game.update()
+        game.keys_pressed[keysym] = pressed
+    while recording.final_tick is not None and game.tick < recording.final_tick and game.is_running:
+        game.update()
+    return game.tick, game.state_hash()
+
+
+REPLAYERS = {'invaders': replay_invaders, 'platformer': replay_platformer}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game session headless at full speed.")
+    parser.add_argument('recording')
+    parser.add_argument('--profile', metavar='FILE', help="time the simulation phases and dump them to FILE")
+    parser.add_argument('--level', metavar='FILE', help="platformer level file, if it has moved since recording")
+    args = parser.parse_args(argv)
+
+    recording = Recording(args.recording)
+    profiler = None
+    if args.profile:
+        from profiler import FrameProfiler
+        profiler = FrameProfiler(window=1_000_000)
+
+    start = time.perf_counter()
+    try:
+        if recording.game == 'platformer':
+            ticks, state_hash = replay_platformer(recording, profiler, args.level)
+        else:
+            ticks, state_hash = REPLAYERS[recording.game](recording, profiler)
+    except (OSError, ValueError) as e:
+        print(f"cannot replay {args.recording}: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{recording.game} seed={recording.seed}: replayed {ticks} ticks in {elapsed:.3f} s "
+          f"({ticks / elapsed if elapsed else 0:.0f} ticks/s)")
+    if profiler:
+        profiler.dump(args.profile)
+
+    if recording.final_hash is None:
+        print("Recording has no end record; final state not checked.")
+        return 0
+    if ticks == recording.final_tick and state_hash == recording.final_hash:
+        print(f"Final state hash matches ({state_hash.hex()}).")
+        return 0
+    print(f"MISMATCH: recorded tick {recording.final_tick} hash {recording.final_hash.hex()}, "
+          f"replayed tick {ticks} hash {state_hash.hex()}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
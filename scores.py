@@ -0,0 +1,410 @@
+"""
+Score-file import for the Top Scorer app.
+
+A score file holds one Name:Score record per line, the entry box format
+with newlines in place of commas. By default names are merged the way the
+entry box merges them: a name's last score wins, and among equal scores
+the name that appeared first ranks first. With unique_names=False every
+record counts on its own, and only the k best records, running totals and
+the first few malformed lines are kept, so memory stays flat however large
+the file is; merging names needs memory in proportion to the number of
+players.
+
+Large files are memory-mapped and cut into shards at line boundaries,
+which a process pool parses in parallel. When names are merged, each shard
+also sorts its names into buckets by a hash of the name and spills them to
+a temporary directory; a second pass merges each bucket across shards in
+file order, so every name is resolved by exactly one worker and the
+partial results combine exactly.
+
+Imports can report progress and be cancelled from another thread: progress
+is called with (fraction done, current leader) after each block or shard,
+and a set cancel event stops the import with Cancelled at the next one.
+
+    python scores.py nightly_export.txt -k 10 --workers 8
+"""
+import argparse
+import concurrent.futures
+import heapq
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+HIGH_SCORE = 95
+MAX_REPORTED_ERRORS = 100
+BLOCK_SIZE = 1 << 22  # bytes of a shard parsed at a time
+PARALLEL_MIN_SIZE = 1 << 24  # smaller files are parsed in-process
+
+
+class Cancelled(Exception):
+    """Raised by an import whose cancel event was set."""
+
+
+def parse_record(text):
+    """Parses one 'Name:Score' record into (name, score); raises ValueError if malformed."""
+    parts = text.strip().split(':')
+    if len(parts) != 2:
+        raise ValueError("Incorrect format")
+    name, score_str = parts
+    return name.strip(), int(score_str.strip())
+
+
+def parse_lines(lines, errors, first_line=1):
+    """
+    Yields (line number, name bytes, score) for each well-formed record in an
+    iterable of byte lines. Blank lines are skipped; malformed ones are logged
+    in errors and parsing carries on.
+    """
+    for line_no, line in enumerate(lines, first_line):
+        if line.count(b':') != 1:
+            if line.strip():
+                errors.add(line_no, "expected Name:Score")
+            continue
+        name, _, score = line.partition(b':')
+        try:
+            yield line_no, name.strip(), int(score)
+        except ValueError:
+            errors.add(line_no, "score is not an integer")
+
+
+class ErrorLog:
+    """Counts malformed lines and keeps the first few, with their line numbers, for reporting."""
+    def __init__(self, limit=MAX_REPORTED_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.lines = []  # (line number, reason)
+
+    def add(self, line_no, reason):
+        self.count += 1
+        if len(self.lines) < self.limit:
+            self.lines.append((line_no, reason))
+
+
+class TopK:
+    """
+    The k highest-scoring records seen so far, in a min-heap of k entries.
+    Equal scores rank by position (line number or byte offset) in the file,
+    as max() over the entry box does.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.heap = []  # (score, -position, name bytes); the weakest record is heap[0]
+
+    def add(self, position, name, score):
+        entry = (score, -position, name)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def result(self):
+        """Returns [(name, score)] best first."""
+        return [(name.decode('utf-8', 'replace'), score)
+                for score, _, name in sorted(self.heap, reverse=True)]
+
+
+class ScoreReport:
+    """Summary of one import: top records, count/min/max/mean, high scores and malformed lines."""
+    def __init__(self, k):
+        self.top = TopK(k)
+        self.errors = ErrorLog()
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.high = 0  # scores above HIGH_SCORE
+
+    def add(self, position, name, score):
+        self.top.add(position, name, score)
+        self.count += 1
+        self.total += score
+        if self.min is None or score < self.min:
+            self.min = score
+        if self.max is None or score > self.max:
+            self.max = score
+        if score > HIGH_SCORE:
+            self.high += 1
+
+    def leader(self):
+        """Returns the best (name, score) so far, or None."""
+        best = self.top.result()[:1]
+        return best[0] if best else None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other):
+        """Folds in the report of a disjoint part of the input."""
+        for entry in other.top.heap:
+            if len(self.top.heap) < self.top.k:
+                heapq.heappush(self.top.heap, entry)
+            elif entry > self.top.heap[0]:
+                heapq.heapreplace(self.top.heap, entry)
+        self.count += other.count
+        self.total += other.total
+        self.high += other.high
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+
+class LatestScores:
+    """
+    Folds (position, name, score) records into names, {name: (last score,
+    first position)}, and keeps track of the leader as it goes: a record that
+    beats the leader takes its place, so the names are only scanned again
+    after the leader's own score has gone down.
+    """
+    def __init__(self):
+        self.names = {}
+        self.best = None  # (score, -first position, name) of the leader, or None
+        self.stale = False  # set when the leader's score went down; leader() rescans
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, records):
+        names = self.names
+        best, stale = self.best, self.stale
+        for position, name, score in records:
+            seen = names.get(name)
+            if seen is not None:
+                position = seen[1]
+            names[name] = (score, position)
+            if best is None or score > best[0] or (score == best[0] and -position > best[1]):
+                best, stale = (score, -position, name), False  # beats everyone best did
+            elif name == best[2] and score < best[0]:
+                stale = True
+        self.best, self.stale = best, stale
+
+    def leader(self):
+        """Returns the leading (name, score), or None if there are no names yet."""
+        if self.stale:
+            name, (score, position) = max(self.names.items(), key=lambda item: (item[1][0], -item[1][1]))
+            self.best, self.stale = (score, -position, name), False
+        if self.best is None:
+            return None
+        score, _, name = self.best
+        return name.decode('utf-8', 'replace'), score
+
+
+def report_names(names, k):
+    """Builds a ScoreReport over merged names, ranking ties by first appearance."""
+    report = ScoreReport(k)
+    add = report.add
+    for name, (score, position) in names.items():
+        add(position, name, score)
+    return report
+
+
+def read_blocks(f):
+    """Yields (lines, bytes read so far) for a binary file, about BLOCK_SIZE bytes of whole lines at a time."""
+    rest = b''
+    done = 0
+    while True:
+        data = f.read(BLOCK_SIZE)
+        done += len(data)
+        if not data:
+            if rest:
+                yield [rest], done
+            return
+        lines = (rest + data).split(b'\n')
+        rest = lines.pop()
+        yield lines, done
+
+
+def check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled
+
+
+def import_scores(path, k=10, unique_names=True, workers=None, progress=None, cancel=None):
+    """
+    Reads a score file and returns its ScoreReport. Files of PARALLEL_MIN_SIZE
+    bytes or more are split across a pool of workers (default: one per CPU).
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if workers > 1 and size >= PARALLEL_MIN_SIZE:
+        return import_parallel(path, k, unique_names, workers, progress, cancel)
+    errors = ErrorLog()
+    latest = LatestScores()
+    report = ScoreReport(k)
+    add = report.add
+    line = 1
+    with open(path, 'rb') as f:
+        for lines, done in read_blocks(f):
+            check_cancel(cancel)
+            records = parse_lines(lines, errors, line)
+            if unique_names:
+                latest.add(records)
+            else:
+                for line_no, name, score in records:
+                    add(line_no, name, score)
+            line += len(lines)
+            if progress:
+                progress(done / size if size else 1.0, latest.leader() if unique_names else report.leader())
+    if unique_names:
+        report = report_names(latest.names, k)
+    report.errors = errors
+    return report
+
+
+# --- Parallel import ---
+
+def shard_ranges(path, shards):
+    """Splits a file into about `shards` byte ranges that each start at the beginning of a line."""
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = [0]
+        for n in range(1, shards):
+            cut = mm.find(b'\n', max(bounds[-1], size * n // shards))
+            if cut == -1:
+                break
+            if cut + 1 > bounds[-1] and cut + 1 < size:
+                bounds.append(cut + 1)
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def shard_blocks(mm, start, end):
+    """Yields the lines of mm[start:end] as lists of bytes, about BLOCK_SIZE bytes at a time."""
+    while start < end:
+        stop = min(end, start + BLOCK_SIZE)
+        if stop < end:
+            cut = mm.rfind(b'\n', start, stop)
+            if cut == -1:
+                cut = mm.find(b'\n', stop, end)
+            stop = end if cut == -1 else cut + 1
+        lines = mm[start:stop].split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        yield lines
+        start = stop
+
+
+def parse_shard(path, start, end, k, spill_dir, buckets, shard):
+    """
+    Pool worker: parses one shard and returns (line count, ScoreReport), with
+    error line numbers counted from the start of the shard. Records are placed
+    at start + their line number in the shard, which orders them across shards
+    as their lines are ordered in the file. With spill_dir, names are merged
+    within the shard and written to one file per hash bucket instead, and the
+    report holds only the errors.
+    """
+    report = ScoreReport(k)
+    errors = report.errors
+    parts = [{} for _ in range(buckets)] if spill_dir else None
+    line = 1
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for lines in shard_blocks(mm, start, end):
+            records = ((start + line_no, name, score) for line_no, name, score in parse_lines(lines, errors, line))
+            if parts is None:
+                add = report.add
+                for position, name, score in records:
+                    add(position, name, score)
+            else:
+                crc32 = zlib.crc32
+                for position, name, score in records:
+                    part = parts[crc32(name) % buckets]
+                    seen = part.get(name)
+                    part[name] = (score, position if seen is None else seen[1])
+            line += len(lines)
+    if parts is not None:
+        for bucket, part in enumerate(parts):
+            with open(os.path.join(spill_dir, f"{shard}-{bucket}.pkl"), 'wb') as out:
+                pickle.dump(part, out, pickle.HIGHEST_PROTOCOL)
+    return line - 1, report
+
+
+def merge_bucket(spill_dir, bucket, shards, k):
+    """Pool worker: resolves one bucket's names across all shards, in file order, and reports on them."""
+    names = {}
+    for shard in range(shards):
+        path = os.path.join(spill_dir, f"{shard}-{bucket}.pkl")
+        with open(path, 'rb') as f:
+            part = pickle.load(f)
+        os.remove(path)
+        for name, (score, position) in part.items():
+            seen = names.get(name)
+            names[name] = (score, position if seen is None else min(position, seen[1]))
+    return report_names(names, k)
+
+
+def import_parallel(path, k, unique_names, workers, progress=None, cancel=None):
+    """import_scores() over a pool of worker processes; the result is identical."""
+    ranges = shard_ranges(path, workers * 4)
+    shards = len(ranges)
+    steps = shards + (workers if unique_names else 0)
+    report = ScoreReport(k)
+    results = [None] * shards
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool, \
+            tempfile.TemporaryDirectory(prefix='scores-') as spill_dir:
+        spill = spill_dir if unique_names else None
+
+        def run(futures):
+            """Yields each future's key and result as it completes, stopping the pool if cancelled."""
+            for future in concurrent.futures.as_completed(futures):
+                if cancel is not None and cancel.is_set():
+                    pool.shutdown(cancel_futures=True)
+                    raise Cancelled
+                yield futures[future], future.result()
+
+        futures = {pool.submit(parse_shard, path, start, end, k, spill, workers, shard): shard
+                   for shard, (start, end) in enumerate(ranges)}
+        for step, (shard, result) in enumerate(run(futures), 1):
+            results[shard] = result
+            if not unique_names:
+                report.merge(result[1])
+            if progress:
+                progress(step / steps, report.leader())
+        if unique_names:
+            # Each bucket holds whole names, so the leader of the buckets merged so far is exact for them.
+            futures = {pool.submit(merge_bucket, spill_dir, bucket, shards, k): bucket for bucket in range(workers)}
+            for step, (_, bucket_report) in enumerate(run(futures), shards + 1):
+                report.merge(bucket_report)
+                if progress:
+                    progress(step / steps, report.leader())
+
+    # Shard line numbers become file line numbers once the earlier shards' line counts are known.
+    errors = report.errors
+    offset = 0
+    for line_count, shard_report in results:
+        for line_no, reason in shard_report.errors.lines:
+            errors.add(offset + line_no, reason)
+        errors.count += shard_report.errors.count - len(shard_report.errors.lines)
+        offset += line_count
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a Name:Score file.")
+    parser.add_argument('path')
+    parser.add_argument('-k', type=int, default=10, help="how many top scores to list")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="processes for large files")
+    parser.add_argument('--all-records', action='store_true',
+                        help="count every record instead of each name's last score (constant memory)")
+    args = parser.parse_args(argv)
+
+    report = import_scores(args.path, args.k, unique_names=not args.all_records, workers=args.workers)
+    for rank, (name, score) in enumerate(report.top.result(), 1):
+        print(f"{rank:>4}. {name}: {score}")
+    if report.count:
+        counted = 'records' if args.all_records else 'names'
+        print(f"{report.count} {counted}, min {report.min}, max {report.max}, mean {report.mean:.2f}, "
+              f"{report.high} above {HIGH_SCORE}")
+    for line_no, reason in report.errors.lines:
+        print(f"line {line_no}: {reason}", file=sys.stderr)
+    if report.errors.count > len(report.errors.lines):
+        print(f"... {report.errors.count - len(report.errors.lines)} more malformed lines", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,165 @@
+import hashlib
+import os
+import sys
 import tkinter as tk
 import random
 
-class SpaceInvaders:
+from gameloop import FixedTimestepLoop
+from inputqueue import InputQueue
+from leaderboard import preload, record_result
+from profiler import FrameProfiler
+from render import CanvasBatch, HudLabel
+from replay import KEYS, InputRecorder, session_path
+
+
+class SpatialHash:
     """
-    A class to create a high-end retro Space Invaders game.
-    The game features player movement, enemy logic, bullet firing, and collision detection.
+    A uniform-grid broad phase for collision checks.
+    Each key is bucketed into every cell its rectangle overlaps, so a query only
+    looks at keys sharing a cell with the query rectangle. Insert and remove are O(1).
     """
-    def __init__(self, master):
-        """Initializes the game window, canvas, and game objects."""
-        self.master = master
-        self.master.title("👾 Space Invaders")
-        self.master.geometry("800x600")
-        self.master.resizable(False, False)
-        self.master.configure(bg='#0A1828')
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}     # (col, row) -> set of keys
+        self.key_cells = {}  # key -> list of (col, row)
+
+    def clear(self):
+        self.cells.clear()
+        self.key_cells.clear()
+
+    def cell_range(self, coords):
+        """Returns the (col, row) cells covered by a [x1, y1, x2, y2] rectangle."""
+        size = self.cell_size
+        col1, row1 = int(coords[0] // size), int(coords[1] // size)
+        col2, row2 = int(coords[2] // size), int(coords[3] // size)
+        return [(col, row) for col in range(col1, col2 + 1) for row in range(row1, row2 + 1)]
+
+    def insert(self, key, coords):
+        cells = self.cell_range(coords)
+        self.key_cells[key] = cells
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket is None:
+                self.cells[cell] = {key}
+            else:
+                bucket.add(key)
 
+    def remove(self, key):
+        for cell in self.key_cells.pop(key, ()):
+            bucket = self.cells[cell]
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, coords):
+        """Returns the set of keys that may overlap the rectangle."""
+        found = set()
+        cells = self.cells
+        for cell in self.cell_range(coords):
+            bucket = cells.get(cell)
+            if bucket:
+                found |= bucket
+        return found
+
+
+class Formation:
+    """
+    The invader formation, moved as one rigid body.
+    Stores one origin plus a rows x cols alive mask; an enemy's rectangle is
+    derived from its grid cell, so moving the formation and finding its
+    extent are O(1) however many invaders it holds. Enemies are identified
+    by their row-major cell index.
+    """
+    def __init__(self, rows, cols, x, y, spacing_x, spacing_y, size, cell_size):
+        self.rows = rows
+        self.cols = cols
+        self.x = x
+        self.y = y
+        self.spacing_x = spacing_x
+        self.spacing_y = spacing_y
+        self.size = size
+        self.alive = bytearray(b'\x01') * (rows * cols)
+        self.alive_count = rows * cols
+        self.col_counts = [rows] * cols
+        self.row_counts = [cols] * rows
+        self.left_col, self.right_col = 0, cols - 1
+        self.top_row, self.bottom_row = 0, rows - 1
+        self.kills = []  # indices killed since the renderer last drained them
+
+        # The grid holds cells in formation-local coordinates and never moves;
+        # queries are translated into it instead.
+        self.grid = SpatialHash(cell_size)
+        for index in range(rows * cols):
+            self.grid.insert(index, self.local_coords(index))
+
+    def local_coords(self, index):
+        row, col = divmod(index, self.cols)
+        x = col * self.spacing_x
+        y = row * self.spacing_y
+        return [x, y, x + self.size, y + self.size]
+
+    def coords(self, index):
+        """Returns the [x1, y1, x2, y2] rectangle of the enemy at a cell index."""
+        row, col = divmod(index, self.cols)
+        x = self.x + col * self.spacing_x
+        y = self.y + row * self.spacing_y
+        return [x, y, x + self.size, y + self.size]
+
+    def alive_indices(self):
+        return [index for index, alive in enumerate(self.alive) if alive]
+
+    def extent(self):
+        """Returns the bounding box of the live enemies."""
+        return [self.x + self.left_col * self.spacing_x,
+                self.y + self.top_row * self.spacing_y,
+                self.x + self.right_col * self.spacing_x + self.size,
+                self.y + self.bottom_row * self.spacing_y + self.size]
+
+    def move(self, dx, dy):
+        self.x += dx
+        self.y += dy
+
+    def kill(self, index):
+        """Marks an enemy dead and shrinks the cached extent if needed."""
+        self.alive[index] = 0
+        self.alive_count -= 1
+        self.grid.remove(index)
+        self.kills.append(index)
+        row, col = divmod(index, self.cols)
+        self.col_counts[col] -= 1
+        self.row_counts[row] -= 1
+        if not self.alive_count:
+            return
+        while not self.col_counts[self.left_col]:
+            self.left_col += 1
+        while not self.col_counts[self.right_col]:
+            self.right_col -= 1
+        while not self.row_counts[self.top_row]:
+            self.top_row += 1
+        while not self.row_counts[self.bottom_row]:
+            self.bottom_row -= 1
+
+    def query(self, coords):
+        """Returns the indices of live enemies that may overlap the rectangle."""
+        x, y = self.x, self.y
+        return self.grid.query([coords[0] - x, coords[1] - y, coords[2] - x, coords[3] - y])
+
+    def drain_kills(self):
+        kills, self.kills = self.kills, []
+        return kills
+
+
+class InvadersWorld:
+    """
+    The pure-Python Space Invaders simulation.
+    Holds positions, velocities, lives and score, and steps without a Tk root.
+    Every rectangle is stored as a [x1, y1, x2, y2] list, the same layout
+    canvas.coords() returns, so the renderer can copy it straight across.
+    """
+    def __init__(self, width=700, height=500, seed=None):
         # --- Game Constants ---
+        self.WIDTH = width
+        self.HEIGHT = height
         self.PLAYER_SIZE = 40
         self.ENEMY_SIZE = 30
         self.BULLET_SIZE = 10
@@ -24,218 +169,418 @@ class SpaceInvaders:
         self.ENEMY_DROP_SPEED = 20
         self.LIVES = 3
         self.MAX_ENEMIES = 30
+        self.ENEMY_ROWS = 5
+        self.ENEMY_COLS = 6
+        self.ENEMY_SPACING_X = 70
+        self.ENEMY_SPACING_Y = 40
+        self.GRID_CELL_SIZE = 64
+        self.BULLET_POOL_SIZE = 32  # most player bullets alive at once
+        self.FIRE_COOLDOWN = 4      # ticks between shots; 0 disables the limit
 
-        # --- Game Variables ---
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Resets all game objects to their initial state, reseeding the game's RNG."""
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
         self.score = 0
         self.lives = self.LIVES
+        self.tick = 0
+        self.game_over = False
+        self.enemy_direction = 1
+        self.bullets = {}  # pool slot -> [x1, y1, x2, y2], in firing order
+        self.free_bullets = list(range(self.BULLET_POOL_SIZE - 1, -1, -1))
+        self.fire_cooldown = 0
+        self.held = set()  # keys held down; each acts once per tick
+        self.create_player()
+        self.create_enemies()
+
+    def create_player(self):
+        """Creates the player's ship."""
+        x = self.WIDTH // 2
+        y = self.HEIGHT - 50
+        self.player = [x - self.PLAYER_SIZE // 2, y,
+                       x + self.PLAYER_SIZE // 2, y + self.PLAYER_SIZE // 2]
+
+    def create_enemies(self):
+        """Creates a grid of enemy invaders."""
+        self.formation = Formation(self.ENEMY_ROWS, self.ENEMY_COLS, 100, 50,
+                                   self.ENEMY_SPACING_X, self.ENEMY_SPACING_Y,
+                                   self.ENEMY_SIZE, self.GRID_CELL_SIZE)
+
+    @property
+    def enemies(self):
+        """Live enemy rectangles by cell index. Built on demand, so O(E)."""
+        formation = self.formation
+        return {index: formation.coords(index) for index in formation.alive_indices()}
+
+    @property
+    def enemy_count(self):
+        return self.formation.alive_count
+
+    def move_player(self, dx):
+        """Moves the player sideways, keeping it within the playfield."""
+        player = self.player
+        player[0] += dx
+        player[2] += dx
+        if player[0] < 0:
+            player[0], player[2] = 0, self.PLAYER_SIZE
+        elif player[2] > self.WIDTH:
+            player[0], player[2] = self.WIDTH - self.PLAYER_SIZE, self.WIDTH
+
+    def set_key(self, keysym, pressed):
+        """Marks a key held or released; held keys are applied at the start of every step."""
+        if pressed:
+            self.held.add(keysym)
+        else:
+            self.held.discard(keysym)
+
+    def apply_key(self, keysym):
+        """Applies one player key press immediately, e.g. from a scripted policy."""
+        if keysym == 'Left':
+            self.move_player(-self.PLAYER_SPEED)
+        elif keysym == 'Right':
+            self.move_player(self.PLAYER_SPEED)
+        elif keysym == 'space':
+            self.fire_bullet()
+
+    def fire_bullet(self):
+        """
+        Fires a bullet from the player's ship and returns its pool slot.
+        Returns None while the fire-rate limit is cooling down or the pool is full.
+        """
+        if self.fire_cooldown > 0 or not self.free_bullets:
+            return None
+        x = (self.player[0] + self.player[2]) / 2
+        y = self.player[1]
+        slot = self.free_bullets.pop()
+        self.bullets[slot] = [x - self.BULLET_SIZE // 2, y - self.BULLET_SIZE,
+                              x + self.BULLET_SIZE // 2, y]
+        self.fire_cooldown = self.FIRE_COOLDOWN
+        return slot
+
+    def release_bullet(self, slot):
+        """Returns a bullet's slot to the pool."""
+        del self.bullets[slot]
+        self.free_bullets.append(slot)
+
+    def move_bullets(self):
+        """Moves all player bullets and culls those that left the screen."""
+        dy = self.BULLET_SPEED
+        off_screen = []
+        for slot, coords in self.bullets.items():
+            coords[1] += dy
+            coords[3] += dy
+            if coords[3] < 0 or coords[1] > self.HEIGHT:
+                off_screen.append(slot)
+        for slot in off_screen:
+            self.release_bullet(slot)
+
+    def move_enemies(self):
+        """Moves the enemies and handles side-to-side movement logic."""
+        formation = self.formation
+        move_sideways = self.ENEMY_SPEED * self.enemy_direction
+        move_down = 0
+
+        # Check if the formation hit the side walls
+        if formation.alive_count:
+            left, _, right, _ = formation.extent()
+            if left <= 0 and self.enemy_direction == -1:
+                self.enemy_direction = 1
+                move_sideways = 0
+                move_down = self.ENEMY_DROP_SPEED
+            elif right >= self.WIDTH and self.enemy_direction == 1:
+                self.enemy_direction = -1
+                move_sideways = 0
+                move_down = self.ENEMY_DROP_SPEED
+
+        formation.move(move_sideways, move_down)
+
+    def check_collisions(self):
+        """Checks for all collisions between bullets, enemies, and player."""
+        formation = self.formation
+
+        # Player bullet hitting an enemy. Indices follow creation order, so the
+        # lowest overlapping one is the enemy a front-to-back scan would hit.
+        for slot, bullet_coords in list(self.bullets.items()):
+            hits = [index for index in formation.query(bullet_coords)
+                    if check_collision_coords(bullet_coords, formation.coords(index))]
+            if hits:
+                self.release_bullet(slot)
+                formation.kill(min(hits))
+                self.score += 10
+
+        # Check for player-enemy collision
+        for index in formation.query(self.player):
+            if check_collision_coords(self.player, formation.coords(index)):
+                self.lives -= 1
+                self.game_over = True
+                break
+
+    def state_hash(self):
+        """Returns a 16-byte digest of the full simulation state."""
+        formation = self.formation
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((self.tick, self.score, self.lives, self.game_over, self.enemy_direction,
+                            self.fire_cooldown, self.player, formation.x, formation.y,
+                            list(self.bullets.items()))).encode())
+        digest.update(bytes(formation.alive))
+        return digest.digest()
+
+    def step(self):
+        """Advances the simulation by one tick."""
+        if self.game_over:
+            return
+        for keysym in ('Left', 'Right', 'space'):
+            if keysym in self.held:
+                self.apply_key(keysym)
+        if self.fire_cooldown > 0:
+            self.fire_cooldown -= 1
+        self.move_bullets()
+        self.move_enemies()
+        self.check_collisions()
+        self.tick += 1
+        if not self.formation.alive_count or self.lives <= 0:
+            self.game_over = True
+
+
+def check_collision_coords(coords1, coords2):
+    """Helper function to check for intersection of two rectangles."""
+    x1, y1, x2, y2 = coords1
+    x3, y3, x4, y4 = coords2
+    return x1 < x4 and x2 > x3 and y1 < y4 and y2 > y3
+
+
+class SpaceInvaders:
+    """
+    A class to create a high-end retro Space Invaders game.
+    The game features player movement, enemy logic, bullet firing, and collision detection.
+    All game state lives in an InvadersWorld; the canvas only mirrors it.
+    """
+    def __init__(self, master):
+        """Initializes the game window, canvas, and game objects."""
+        self.master = master
+        self.master.title("👾 Space Invaders")
+        self.master.geometry("800x600")
+        self.master.resizable(False, False)
+        self.master.configure(bg='#0A1828')
+
+        # --- Game Variables ---
+        self.world = InvadersWorld()
         self.is_running = False
         self.player = None
-        self.enemies = []
-        self.bullets = []
-        self.enemy_bullet_cooldown = 0
-        self.enemy_direction = 1
+        self.recorder = None
+        self.ranked = False  # set by start_game, so headless runs never reach the leaderboard
+        self.final_item = None  # the game-over text, which show_rank() adds the rank to
+        self.enemy_items = {}   # formation cell index -> canvas item
+        self.drawn_formation_at = (0, 0)
+        self.bullet_items = []  # one pooled canvas item per world bullet slot
+        self.shown_bullets = {}  # slot -> coords last drawn
+        self.drawn_tick = 0
+        self.loop = FixedTimestepLoop(master, self.update, self.render, tick_rate=50)
+        self.input = InputQueue(master, KEYS['invaders'])
 
         # --- UI Components ---
-        self.score_label = tk.Label(master, text=f"Score: 0 | Lives: {self.lives}",
+        self.score_label = tk.Label(master, text=f"Score: 0 | Lives: {self.world.lives}",
                                     font=("Arial", 20, "bold"), bg='#0A1828', fg='#FFFFFF')
         self.score_label.pack(pady=10)
+        self.hud = HudLabel(self.score_label, "Score: {} | Lives: {}")
 
         self.canvas = tk.Canvas(master, width=700, height=500, bg='#1A2D3E',
                                 highlightthickness=0, bd=0, relief='flat')
         self.canvas.pack(pady=10)
+        self.batch = CanvasBatch(self.canvas)
 
-        # Bind keyboard controls
-        self.master.bind('<Left>', self.move_player)
-        self.master.bind('<Right>', self.move_player)
-        self.master.bind('<space>', self.fire_bullet)
+        # Bind keyboard controls; player keys are queued and applied once per tick
+        self.input.bind()
         self.master.bind('<Return>', self.start_game)
 
+        # Opt-in frame profiler: F3 toggles it and its overlay, GAME_PROFILE=<file>
+        # enables it from startup, and the stats are dumped to that file on exit.
+        self.profiler = FrameProfiler()
+        self.profiler.watch(self.world, 'move_bullets', 'move_enemies', 'check_collisions')
+        self.profiler.watch(self.loop, 'render')
+        self.profiler.watch_frame(self.loop)
+        self.profiler.count_tk_calls(self.canvas, self.score_label)
+        self.profiler.attach_overlay(self.canvas)
+        self.master.bind('<F3>', self.profiler.toggle)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        if os.environ.get('GAME_PROFILE'):
+            self.profiler.enable()
+
         # Start message
         self.message = self.canvas.create_text(
             350, 250, text="Press ENTER to Start", font=("Arial", 24, "bold"), fill="#FFFFFF"
         )
 
+    @property
+    def score(self):
+        return self.world.score
+
+    @property
+    def lives(self):
+        return self.world.lives
+
     def start_game(self, event=None):
         """Initializes game state and starts the game loop."""
         if self.is_running:
             return
 
         self.is_running = True
-        self.score = 0
-        self.lives = self.LIVES
-        self.score_label.config(text=f"Score: {self.score} | Lives: {self.lives}")
+        self.ranked = True
+        preload('invaders')
         self.canvas.delete(self.message)
         self.reset_game()
+        # GAME_RECORD=<dir> saves every session there for replay.py
+        if os.environ.get('GAME_RECORD'):
+            self.recorder = InputRecorder(session_path(os.environ['GAME_RECORD'], 'invaders'),
+                                          'invaders', self.world.seed)
         self.game_loop()
 
     def reset_game(self):
         """Resets all game objects to their initial state."""
         self.canvas.delete("all")
-        self.enemies.clear()
-        self.bullets.clear()
+        self.batch.clear()
+        self.world.reset()
+        self.drawn_tick = 0
+        self.enemy_items.clear()
         self.create_player()
         self.create_enemies()
-        self.enemy_direction = 1
-        self.master.bind('<Left>', self.move_player)
-        self.master.bind('<Right>', self.move_player)
-        self.master.bind('<space>', self.fire_bullet)
+        self.create_bullet_pool()
+        self.update_score_label()
+        self.input.clear()
+        self.input.bind()
         self.master.bind('<Return>', self.start_game)
 
-
     def create_player(self):
-        """Creates the player's ship."""
-        x = 350
-        y = 450
+        """Creates the canvas item for the player's ship."""
         self.player = self.canvas.create_rectangle(
-            x - self.PLAYER_SIZE // 2, y,
-            x + self.PLAYER_SIZE // 2, y + self.PLAYER_SIZE // 2,
-            fill='#00FF00', tags="player"
+            *self.world.player, fill='#00FF00', tags="player"
         )
 
     def create_enemies(self):
-        """Creates a grid of enemy invaders."""
-        for row in range(5):
-            for col in range(6):
-                x = 100 + col * 70
-                y = 50 + row * 40
-                enemy = self.canvas.create_oval(
-                    x, y, x + self.ENEMY_SIZE, y + self.ENEMY_SIZE,
-                    fill='#FF00FF', tags="enemy"
-                )
-                self.enemies.append(enemy)
-
-    def move_player(self, event):
-        """Moves the player left or right based on key presses."""
-        if not self.is_running:
-            return
-
-        dx = 0
-        if event.keysym == 'Left':
-            dx = -self.PLAYER_SPEED
-        elif event.keysym == 'Right':
-            dx = self.PLAYER_SPEED
-
-        self.canvas.move(self.player, dx, 0)
-        
-        # Keep player within bounds
-        player_coords = self.canvas.coords(self.player)
-        if player_coords[0] < 0:
-            self.canvas.coords(self.player, 0, player_coords[1], self.PLAYER_SIZE, player_coords[3])
-        elif player_coords[2] > 700:
-            self.canvas.coords(self.player, 700 - self.PLAYER_SIZE, player_coords[1], 700, player_coords[3])
-
-
-    def fire_bullet(self, event):
-        """Fires a bullet from the player's ship."""
-        if not self.is_running:
-            return
+        """Creates canvas items for the enemy invaders."""
+        formation = self.world.formation
+        for index, coords in self.world.enemies.items():
+            self.enemy_items[index] = self.create_enemy(coords)
+        formation.drain_kills()
+        self.drawn_formation_at = (formation.x, formation.y)
 
-        player_coords = self.canvas.coords(self.player)
-        x = (player_coords[0] + player_coords[2]) / 2
-        y = player_coords[1]
-        bullet = self.canvas.create_rectangle(
-            x - self.BULLET_SIZE // 2, y - self.BULLET_SIZE,
-            x + self.BULLET_SIZE // 2, y,
-            fill='#00FFFF', tags="bullet"
-        )
-        self.bullets.append(bullet)
+    def create_enemy(self, coords):
+        """Creates the canvas item for one enemy invader."""
+        return self.canvas.create_oval(*coords, fill='#FF00FF', tags="enemy")
 
-    def move_bullets(self):
-        """Moves all player and enemy bullets."""
-        # Player bullets
-        for bullet in self.bullets:
-            self.canvas.move(bullet, 0, self.BULLET_SPEED)
+    def create_bullet_pool(self):
+        """Creates one hidden canvas item per bullet slot; they are recycled, never deleted."""
+        self.bullet_items = [
+            self.canvas.create_rectangle(0, 0, 0, 0, fill='#00FFFF', tags="bullet", state='hidden')
+            for _ in range(self.world.BULLET_POOL_SIZE)
+        ]
+        self.shown_bullets.clear()
 
-    def move_enemies(self):
-        """Moves the enemies and handles side-to-side movement logic."""
-        move_sideways = self.ENEMY_SPEED * self.enemy_direction
-        move_down = 0
-        
-        # Check if enemies hit the side walls
-        for enemy in self.enemies:
-            coords = self.canvas.coords(enemy)
-            if coords[0] <= 0 and self.enemy_direction == -1:
-                self.enemy_direction = 1
-                move_sideways = 0
-                move_down = self.ENEMY_DROP_SPEED
-                break
-            if coords[2] >= 700 and self.enemy_direction == 1:
-                self.enemy_direction = -1
-                move_sideways = 0
-                move_down = self.ENEMY_DROP_SPEED
-                break
-        
-        for enemy in self.enemies:
-            self.canvas.move(enemy, move_sideways, move_down)
-        
-    def check_collisions(self):
-        """Checks for all collisions between bullets, enemies, and player."""
-        # Player bullet hitting an enemy
-        for bullet in self.bullets[:]:
-            bullet_coords = self.canvas.coords(bullet)
-            if not bullet_coords: # If bullet was already deleted
-                self.bullets.remove(bullet)
+    def render_bullets(self):
+        """
+        Shows, moves and hides pooled bullet items to match the world's live bullets.
+        Bullets all fly at the same speed, so those already on screen carry a
+        "flying" tag and move together in one call; only bullets that were fired,
+        reused or released since the last frame are written one by one.
+        """
+        world = self.world
+        bullets = world.bullets
+        batch = self.batch
+        shown = self.shown_bullets
+        dy = world.BULLET_SPEED * (world.tick - self.drawn_tick)
+        self.drawn_tick = world.tick
+        for slot in [slot for slot in shown if slot not in bullets]:
+            batch.configure(self.bullet_items[slot], state='hidden', tags=("bullet",))
+            del shown[slot]
+        in_flight = False
+        for slot, coords in bullets.items():
+            drawn = shown.get(slot)
+            coords = tuple(coords)
+            shown[slot] = coords
+            if drawn is not None and drawn[0] == coords[0] and drawn[1] + dy == coords[1]:
+                in_flight = True
                 continue
-                
-            for enemy in self.enemies[:]:
-                enemy_coords = self.canvas.coords(enemy)
-                if not enemy_coords: # If enemy was already deleted
-                    self.enemies.remove(enemy)
-                    continue
-
-                if self.canvas.coords(bullet) and self.canvas.coords(enemy) and \
-                    self.check_collision_coords(bullet_coords, enemy_coords):
-                    
-                    self.canvas.delete(bullet)
-                    if bullet in self.bullets:
-                        self.bullets.remove(bullet)
-                    self.canvas.delete(enemy)
-                    if enemy in self.enemies:
-                        self.enemies.remove(enemy)
-                    
-                    self.score += 10
-                    self.score_label.config(text=f"Score: {self.score} | Lives: {self.lives}")
-                    
-        # Check for player-enemy collision
-        if self.player:
-            player_coords = self.canvas.coords(self.player)
-            for enemy in self.enemies:
-                if self.check_collision_coords(player_coords, self.canvas.coords(enemy)):
-                    self.lives -= 1
-                    self.score_label.config(text=f"Score: {self.score} | Lives: {self.lives}")
-                    self.end_game()
-                    break
-
-    def check_collision_coords(self, coords1, coords2):
-        """Helper function to check for intersection of two rectangles."""
-        x1, y1, x2, y2 = coords1
-        x3, y3, x4, y4 = coords2
-        return x1 < x4 and x2 > x3 and y1 < y4 and y2 > y3
+            batch.set_coords(self.bullet_items[slot], *coords, track=False)
+            batch.configure(self.bullet_items[slot], state='normal', tags=("bullet", "flying"))
+        if in_flight:
+            batch.move("flying", 0, dy)
+
+    def apply_input(self):
+        """Hands this tick's key changes to the world, recording them first if a recording is running."""
+        for keysym, pressed in self.input.drain():
+            if self.recorder:
+                self.recorder.record(self.world.tick, keysym, pressed)
+            self.world.set_key(keysym, pressed)
+
+    def update_score_label(self):
+        """Updates the score HUD; it is redrawn only if the score or lives changed."""
+        self.hud.set(self.world.score, self.world.lives)
+        self.hud.flush()
+
+    def render_enemies(self):
+        """Deletes killed invaders and moves the rest with a single tagged move."""
+        formation = self.world.formation
+        for index in formation.drain_kills():
+            self.batch.delete(self.enemy_items.pop(index))
+        drawn_x, drawn_y = self.drawn_formation_at
+        if formation.x != drawn_x or formation.y != drawn_y:
+            self.batch.move("enemy", formation.x - drawn_x, formation.y - drawn_y)
+            self.drawn_formation_at = (formation.x, formation.y)
+
+    def render(self):
+        """Syncs the canvas from the world model; called once per frame."""
+        world = self.world
+        self.batch.set_coords(self.player, *world.player)
+        self.render_enemies()
+        self.render_bullets()
+        self.batch.flush()
+        self.update_score_label()
+        self.input.rendered()
 
     def end_game(self):
         """Stops the game and displays the game over message."""
         self.is_running = False
+        self.loop.stop()
+        if self.recorder:
+            self.recorder.close(self.world.tick, self.world.state_hash())
+            self.recorder = None
         self.canvas.delete("all")
-        
-        if self.lives <= 0:
-            final_message = "Game Over!\nFinal Score: "
-        elif not self.enemies:
+        self.batch.clear()
+
+        if not self.world.enemy_count and self.world.lives > 0:
             final_message = "You Win!\nFinal Score: "
-            
-        self.canvas.create_text(
+        else:
+            final_message = "Game Over!\nFinal Score: "
+
+        final_message = f"{final_message}{self.world.score}"
+        self.final_item = self.canvas.create_text(
             350, 250,
-            text=f"{final_message}{self.score}",
+            text=final_message,
             font=("Arial", 24, "bold"),
             fill='#FFD700',
             justify='center'
         )
-        
-        self.master.unbind('<Left>')
-        self.master.unbind('<Right>')
-        self.master.unbind('<space>')
-        
+        if self.ranked:
+            pending = record_result('invaders', self.world.score)
+            if pending:
+                self.show_rank(pending, self.final_item, final_message)
+            self.ranked = False
+
+        self.input.unbind()
+        if os.environ.get('GAME_LATENCY'):
+            print(self.input.latency.report(self.loop.frame_interval * 1000), file=sys.stderr)
+
         self.master.after(2000, lambda: self.show_restart_button())
-    
+
+    def show_rank(self, pending, item, message):
+        """Adds the player's rank to the final message once the leaderboard has recorded the result."""
+        if not pending.done():
+            self.master.after(50, self.show_rank, pending, item, message)
+        elif pending.result() and item == self.final_item:
+            self.canvas.itemconfigure(item, text=f"{message}\n#{pending.result()} on the leaderboard")
+
     def show_restart_button(self):
         self.canvas.create_text(
             350, 300,
@@ -246,21 +591,23 @@ class SpaceInvaders:
         )
         self.master.bind('<Return>', self.start_game)
 
-
     def game_loop(self):
-        """The main game loop."""
-        if not self.is_running:
-            return
+        """Starts the fixed-timestep game loop."""
+        self.loop.start()
 
-        self.move_bullets()
-        self.move_enemies()
-        self.check_collisions()
-
-        if not self.enemies or self.lives <= 0:
+    def update(self):
+        """Advances the game by one fixed tick."""
+        self.apply_input()
+        self.world.step()
+        if self.world.game_over:
             self.end_game()
-            return
 
-        self.master.after(20, self.game_loop)
+    def on_close(self):
+        """Dumps profiler stats, if any were collected, and closes the window."""
+        self.profiler.dump(os.environ.get('GAME_PROFILE') or 'space_invaders_profile.json')
+        if os.environ.get('GAME_LATENCY'):
+            self.input.latency.dump(os.environ['GAME_LATENCY'], self.loop.frame_interval * 1000)
+        self.master.destroy()
 
 def main():
     root = tk.Tk()
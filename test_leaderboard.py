@@ -0,0 +1,100 @@
+"""
+Checks the leaderboard's ranked indexes against a plain sorted list, with
+runs small enough that inserts and deletes split and empty them often.
+
+    python -m unittest test_leaderboard
+"""
+import bisect
+import random
+import unittest
+
+import leaderboard
+
+
+class SmallRunsTest(unittest.TestCase):
+    def setUp(self):
+        run_size = leaderboard.RUN_SIZE
+        leaderboard.RUN_SIZE = 4
+        self.addCleanup(setattr, leaderboard, 'RUN_SIZE', run_size)
+
+
+class SortedEntriesTest(SmallRunsTest):
+    def test_index_and_slice_match_sorted_list(self):
+        rng = random.Random(1)
+        expected = []
+        entries = leaderboard.SortedEntries()
+        for step in range(20000):
+            if expected and rng.random() < 0.45:
+                item = expected.pop(rng.randrange(len(expected)))
+                entries.remove(item)
+            else:
+                item = (rng.randrange(300), step)
+                bisect.insort(expected, item)
+                entries.add(item)
+            if step % 97:
+                continue
+            self.assertEqual(len(entries), len(expected))
+            probes = rng.sample(expected, min(5, len(expected))) + [(rng.randrange(300),)]
+            for item in probes:
+                self.assertEqual(entries.index(item), bisect.bisect_left(expected, item))
+            for _ in range(5):
+                start, stop = rng.randint(0, len(expected) + 3), rng.randint(-3, len(expected) + 5)
+                self.assertEqual(entries.slice(start, stop), expected[start:max(stop, 0)])
+
+    def test_built_from_items(self):
+        items = [(n * 7919 % 1000, n) for n in range(1000)]
+        entries = leaderboard.SortedEntries(items)
+        self.assertEqual(entries.slice(0, len(items)), sorted(items))
+        self.assertEqual(entries.index(sorted(items)[500]), 500)
+
+
+class BoardTest(SmallRunsTest):
+    def check(self, board, scores, first_seen):
+        better = -1 if board.direction == leaderboard.HIGHER else 1
+        expected = sorted(scores, key=lambda name: (better * scores[name], first_seen[name]))
+        self.assertEqual(board.top(len(scores)), [(name, scores[name]) for name in expected])
+        self.assertEqual(board.top(7, 11), [(name, scores[name]) for name in expected[11:18]])
+        for rank, name in enumerate(expected, 1):
+            self.assertEqual(board.rank(name), rank)
+
+    def test_rank_and_top_match_sorted_list(self):
+        rng = random.Random(2)
+        for direction in (leaderboard.HIGHER, leaderboard.LOWER):
+            board = leaderboard.Board(direction)
+            scores, first_seen = {}, {}
+            for step in range(3000):
+                name, score = f"p{rng.randrange(200)}", rng.randrange(50)
+                if board.submit(name, score):
+                    scores[name] = score
+                    first_seen[name] = step  # a better score is a new result, so it queues again on ties
+                if step == 1000:
+                    board.ordered()  # from here on the index is kept up to date entry by entry
+            self.check(board, scores, first_seen)
+
+    def test_keep_place_keeps_tie_break(self):
+        board = leaderboard.Board()
+        scores, first_seen = {}, {}
+        rng = random.Random(3)
+        board.ordered()
+        for step in range(2000):
+            name, score = f"p{rng.randrange(100)}", rng.randrange(20)
+            board.set(name, score, keep_place=True)
+            scores[name] = score
+            first_seen.setdefault(name, step)
+        self.check(board, scores, first_seen)
+
+    def test_prefix_search(self):
+        board = leaderboard.Board()
+        rng = random.Random(4)
+        for n in range(500):
+            board.set(''.join(rng.choice('abAB') for _ in range(3)) + str(n), n)
+        names = sorted(board.entries, key=lambda name: (name.casefold(), name))
+        for prefix in ('a', 'Ab', 'bba', 'z', ''):
+            matching = [name for name in names if name.casefold().startswith(prefix.casefold())]
+            low, high = board.prefix_range(prefix)
+            self.assertEqual(high - low, len(matching))
+            self.assertEqual(board.matching(prefix, 3, 13), matching[3:13])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Checks score-file imports against a plain dict: in-process, over the
+process pool, and with blocks smaller than the file; and the leader that
+progress reports carry against a plain max().
+
+    python -m unittest test_scores
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import scores
+
+
+def plain_import(path, k, unique_names):
+    """The import done the obvious way: every line parsed into a list, then sorted."""
+    records = []
+    with open(path, 'rb') as f:
+        for line_no, line in enumerate(f, 1):
+            name, sep, score = line.rstrip(b'\n').partition(b':')
+            if sep and b':' not in score:
+                try:
+                    records.append((line_no, name.strip(), int(score)))
+                except ValueError:
+                    pass
+    if unique_names:
+        latest = {}
+        for _, name, score in records:
+            latest[name] = score  # a dict keeps names in order of first appearance
+        ranked = sorted(latest.items(), key=lambda item: -item[1])  # stable: ties go to the first seen
+        scores_seen = list(latest.values())
+    else:
+        ranked = [(name, score) for _, name, score in sorted(records, key=lambda r: (-r[2], r[0]))]
+        scores_seen = [score for _, _, score in records]
+    top = [(name.decode(), score) for name, score in ranked[:k]]
+    return (top, len(scores_seen), min(scores_seen), max(scores_seen), sum(scores_seen),
+            sum(score > scores.HIGH_SCORE for score in scores_seen))
+
+
+def summary(report):
+    return (report.top.result(), report.count, report.min, report.max, report.total, report.high)
+
+
+class ImportScoresTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            for _ in range(20000):
+                roll = rng.random()
+                if roll < 0.002:
+                    f.write('garbage line\n')
+                elif roll < 0.004:
+                    f.write('x:notnum\n')
+                elif roll < 0.006:
+                    f.write('\n')
+                else:
+                    f.write(f"p{rng.randrange(2000)}:{rng.randrange(101)}\n")
+        self.addCleanup(os.remove, self.path)
+
+    def test_single_process_and_pool_match_plain_dict(self):
+        for unique_names in (True, False):
+            expected = plain_import(self.path, 10, unique_names)
+            single = scores.import_scores(self.path, 10, unique_names, workers=1)
+            pooled = scores.import_parallel(self.path, 10, unique_names, 3)
+            self.assertEqual(summary(single), expected)
+            self.assertEqual(summary(pooled), expected)
+            self.assertEqual(single.errors.count, pooled.errors.count)
+            self.assertEqual(single.errors.lines, pooled.errors.lines)
+
+    def test_small_blocks(self):
+        block_size = scores.BLOCK_SIZE
+        scores.BLOCK_SIZE = 1000
+        try:
+            single = scores.import_scores(self.path, 10, True, workers=1)
+            pooled = scores.import_parallel(self.path, 10, True, 3)
+        finally:
+            scores.BLOCK_SIZE = block_size
+        self.assertEqual(summary(single), plain_import(self.path, 10, True))
+        self.assertEqual(summary(pooled), plain_import(self.path, 10, True))
+
+    def test_progress_leader(self):
+        leaders = []
+        scores.import_scores(self.path, 10, True, workers=1,
+                             progress=lambda fraction, leader: leaders.append(leader))
+        self.assertEqual(leaders[-1], plain_import(self.path, 1, True)[0][0])
+
+
+class LatestScoresTest(unittest.TestCase):
+    def test_leader_matches_max_as_scores_go_down(self):
+        rng = random.Random(5)
+        for _ in range(200):
+            latest = scores.LatestScores()
+            names = {}
+            position = 0
+            for _ in range(rng.randint(1, 6)):
+                batch = []
+                for _ in range(rng.randint(0, 25)):
+                    name, score = f"n{rng.randrange(6)}".encode(), rng.randrange(8)
+                    batch.append((position, name, score))
+                    names[name] = (score, names[name][1] if name in names else position)
+                    position += 1
+                latest.add(batch)
+                expected = None
+                if names:
+                    name, (score, _) = max(names.items(), key=lambda item: (item[1][0], -item[1][1]))
+                    expected = (name.decode(), score)
+                self.assertEqual(latest.leader(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
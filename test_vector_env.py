@@ -0,0 +1,76 @@
+"""
+Checks VectorInvaders against InvadersWorld: the same random actions must
+give every environment the same state as a single game, tick by tick.
+
+    python -m unittest test_vector_env
+"""
+import importlib
+import random
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+if np is not None:
+    import vector_env
+
+InvadersWorld = importlib.import_module("space invader").InvadersWorld
+
+
+@unittest.skipIf(np is None, "vector_env needs NumPy")
+class VectorInvadersTest(unittest.TestCase):
+    def world_state(self, world):
+        formation = world.formation
+        bullets = sorted((coords[0], coords[1]) for coords in world.bullets.values())
+        return (world.score, world.lives, world.tick, world.game_over, world.player[0],
+                formation.x, formation.y, bytes(formation.alive), bullets)
+
+    def env_state(self, env, i):
+        active = env.bullet_active[i]
+        bullets = sorted(zip(env.bullet_x[i][active].tolist(), env.bullet_y[i][active].tolist()))
+        alive = bytes(env.alive[i].reshape(-1).astype(np.uint8).tolist())
+        return (int(env.score[i]), int(env.lives[i]), int(env.tick[i]), bool(env.done[i]),
+                float(env.player_x[i]), float(env.formation_x[i]), float(env.formation_y[i]), alive, bullets)
+
+    def run_against_worlds(self, n_envs, ticks, seed, **constants):
+        rng = random.Random(seed)
+        env = vector_env.VectorInvaders(n_envs, autoreset=False, **constants)
+        env.reset()
+        worlds = []
+        for _ in range(n_envs):
+            world = InvadersWorld(seed=0)
+            for name, value in constants.items():
+                setattr(world, name, value)
+            world.reset(0)
+            worlds.append(world)
+        fire_bias = [rng.random() for _ in range(n_envs)]  # some envs fire constantly, some rarely
+        for tick in range(ticks):
+            actions = []
+            for i, world in enumerate(worlds):
+                if rng.random() < fire_bias[i]:
+                    action = rng.choice((vector_env.FIRE, vector_env.LEFT_FIRE, vector_env.RIGHT_FIRE))
+                else:
+                    action = rng.choice((vector_env.NOOP, vector_env.LEFT, vector_env.RIGHT))
+                actions.append(action)
+                if not world.game_over:
+                    for key in vector_env.ACTIONS[action]:
+                        world.apply_key(key)
+                    world.step()
+            env.step(np.array(actions))
+            for i, world in enumerate(worlds):
+                self.assertEqual(self.env_state(env, i), self.world_state(world), f"env {i} at tick {tick}")
+        return worlds
+
+    def test_matches_single_game_rules(self):
+        worlds = self.run_against_worlds(24, 1500, seed=1)
+        self.assertTrue(any(world.score for world in worlds))
+
+    def test_matches_with_overrides_until_games_end(self):
+        worlds = self.run_against_worlds(16, 2000, seed=2, ENEMY_SPEED=4, FIRE_COOLDOWN=0, BULLET_POOL_SIZE=8)
+        self.assertTrue(all(world.game_over for world in worlds))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,277 @@
+"""
+Batched Space Invaders environments for bot and agent training.
+
+VectorInvaders steps many independent games in lockstep, with all state held
+in NumPy arrays and the InvadersWorld rules (player clamp, fire-rate limit,
+bullet culling, rigid formation movement and the lowest-index-wins bullet
+hits) applied to every environment at once. It needs NumPy, which the games
+themselves do not.
+
+    env = VectorInvaders(1024)
+    obs = env.reset()
+    obs, rewards, dones = env.step(actions)   # actions: int array, see ACTIONS
+"""
+import importlib
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    raise ImportError("vector_env needs NumPy; install it with 'pip install numpy'") from None
+
+InvadersWorld = importlib.import_module("space invader").InvadersWorld
+
+# Each action is the keys pressed before a tick, applied in this order.
+ACTIONS = ((), ('Left',), ('Right',), ('space',), ('Left', 'space'), ('Right', 'space'))
+NOOP, LEFT, RIGHT, FIRE, LEFT_FIRE, RIGHT_FIRE = range(len(ACTIONS))
+
+
+class VectorInvaders:
+    """
+    n_envs Space Invaders games stepped together.
+    Game constants are read from an InvadersWorld, after applying any
+    keyword overrides (e.g. ENEMY_SPEED=2), so both stay in sync.
+    """
+    def __init__(self, n_envs, autoreset=True, **constants):
+        template = InvadersWorld(seed=0)
+        for name, value in constants.items():
+            if not hasattr(template, name):
+                raise AttributeError(f"InvadersWorld has no constant {name!r}")
+            setattr(template, name, value)
+        template.reset(0)
+        self.n = n_envs
+        self.autoreset = autoreset
+        for name in ('WIDTH', 'HEIGHT', 'PLAYER_SIZE', 'ENEMY_SIZE', 'BULLET_SIZE', 'PLAYER_SPEED',
+                     'BULLET_SPEED', 'ENEMY_SPEED', 'ENEMY_DROP_SPEED', 'LIVES', 'ENEMY_ROWS',
+                     'ENEMY_COLS', 'ENEMY_SPACING_X', 'ENEMY_SPACING_Y', 'BULLET_POOL_SIZE',
+                     'FIRE_COOLDOWN'):
+            setattr(self, name, getattr(template, name))
+        self.start_player = template.player[:]
+        self.start_formation = (template.formation.x, template.formation.y)
+        self.BULLET_HALF = self.BULLET_SIZE // 2
+
+        n, rows, cols, pool = n_envs, self.ENEMY_ROWS, self.ENEMY_COLS, self.BULLET_POOL_SIZE
+        self.env_index = np.arange(n)
+        self.player_x = np.zeros(n)
+        self.player_y = float(self.start_player[1])
+        self.formation_x = np.zeros(n)
+        self.formation_y = np.zeros(n)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.alive = np.zeros((n, rows, cols), dtype=bool)
+        self.col_counts = np.zeros((n, cols), dtype=np.int64)
+        self.row_counts = np.zeros((n, rows), dtype=np.int64)
+        self.alive_count = np.zeros(n, dtype=np.int64)
+        self.bullet_active = np.zeros((n, pool), dtype=bool)
+        self.bullet_x = np.zeros((n, pool))  # left edge
+        self.bullet_y = np.zeros((n, pool))  # top edge
+        self.bullet_seq = np.zeros((n, pool), dtype=np.int64)  # firing order
+        self.fire_count = np.zeros(n, dtype=np.int64)
+        self.fire_cooldown = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        # How many grid cells a rectangle of a given size can overlap along each axis.
+        self.bullet_span = self.cell_span(2 * self.BULLET_HALF, self.BULLET_SIZE)
+        self.player_span = self.cell_span(self.PLAYER_SIZE, self.PLAYER_SIZE // 2)
+        self.reset()
+
+    def cell_span(self, width, height):
+        return (int((height + self.ENEMY_SIZE) // self.ENEMY_SPACING_Y) + 1,
+                int((width + self.ENEMY_SIZE) // self.ENEMY_SPACING_X) + 1)
+
+    @property
+    def observation_size(self):
+        return 5 + self.ENEMY_ROWS * self.ENEMY_COLS + 3 * self.BULLET_POOL_SIZE
+
+    def reset(self, mask=None):
+        """Resets every environment, or only those selected by a boolean mask; returns observations."""
+        envs = self.env_index if mask is None else np.flatnonzero(mask)
+        self.player_x[envs] = self.start_player[0]
+        self.formation_x[envs], self.formation_y[envs] = self.start_formation
+        self.direction[envs] = 1
+        self.alive[envs] = True
+        self.col_counts[envs] = self.ENEMY_ROWS
+        self.row_counts[envs] = self.ENEMY_COLS
+        self.alive_count[envs] = self.ENEMY_ROWS * self.ENEMY_COLS
+        self.bullet_active[envs] = False
+        self.fire_count[envs] = 0
+        self.fire_cooldown[envs] = 0
+        self.score[envs] = 0
+        self.lives[envs] = self.LIVES
+        self.tick[envs] = 0
+        self.done[envs] = False
+        return self.observe()
+
+    def observe(self):
+        """Returns float32 observations, one row per environment."""
+        n = self.n
+        obs = np.empty((n, self.observation_size), dtype=np.float32)
+        obs[:, 0] = self.player_x / self.WIDTH
+        obs[:, 1] = self.formation_x / self.WIDTH
+        obs[:, 2] = self.formation_y / self.HEIGHT
+        obs[:, 3] = self.direction
+        obs[:, 4] = self.fire_cooldown / max(1, self.FIRE_COOLDOWN)
+        cells = self.ENEMY_ROWS * self.ENEMY_COLS
+        obs[:, 5:5 + cells] = self.alive.reshape(n, cells)
+        pool = self.BULLET_POOL_SIZE
+        bullets = obs[:, 5 + cells:].reshape(n, pool, 3)
+        bullets[:, :, 0] = self.bullet_active
+        bullets[:, :, 1] = np.where(self.bullet_active, self.bullet_x / self.WIDTH, 0)
+        bullets[:, :, 2] = np.where(self.bullet_active, self.bullet_y / self.HEIGHT, 0)
+        return obs
+
+    def step(self, actions):
+        """
+        Applies one action per environment, advances every live one by a tick,
+        and returns (observations, rewards, dones). With autoreset, finished
+        environments start a new game and their observation is its first frame.
+        """
+        actions = np.asarray(actions)
+        live = ~self.done
+        score_before = self.score.copy()
+
+        self.move_player(live, actions)
+        self.fire(live & ((actions == FIRE) | (actions == LEFT_FIRE) | (actions == RIGHT_FIRE)))
+        np.subtract(self.fire_cooldown, 1, out=self.fire_cooldown, where=live & (self.fire_cooldown > 0))
+        self.move_bullets(live)
+        self.move_enemies(live)
+        self.check_collisions(live)
+        self.tick[live] += 1
+        self.done |= live & ((self.alive_count == 0) | (self.lives <= 0))
+
+        rewards = (self.score - score_before).astype(np.float32)
+        dones = self.done.copy()
+        if self.autoreset and dones.any():
+            self.reset(dones)
+        return self.observe(), rewards, dones
+
+    # --- Rules, mirroring InvadersWorld ---
+
+    def move_player(self, live, actions):
+        dx = np.where((actions == LEFT) | (actions == LEFT_FIRE), -self.PLAYER_SPEED,
+                      np.where((actions == RIGHT) | (actions == RIGHT_FIRE), self.PLAYER_SPEED, 0))
+        x = np.where(live, self.player_x + dx, self.player_x)
+        x = np.where(x < 0, 0, x)
+        self.player_x = np.where(x + self.PLAYER_SIZE > self.WIDTH, self.WIDTH - self.PLAYER_SIZE, x)
+
+    def fire(self, wants):
+        can = wants & (self.fire_cooldown == 0) & ~self.bullet_active.all(axis=1)
+        envs = np.flatnonzero(can)
+        if not len(envs):
+            return
+        slots = np.argmin(self.bullet_active[envs], axis=1)
+        center = self.player_x[envs] + self.PLAYER_SIZE / 2
+        self.bullet_active[envs, slots] = True
+        self.bullet_x[envs, slots] = center - self.BULLET_HALF
+        self.bullet_y[envs, slots] = self.player_y - self.BULLET_SIZE
+        self.bullet_seq[envs, slots] = self.fire_count[envs]
+        self.fire_count[envs] += 1
+        self.fire_cooldown[envs] = self.FIRE_COOLDOWN
+
+    def move_bullets(self, live):
+        moving = self.bullet_active & live[:, None]
+        self.bullet_y += np.where(moving, self.BULLET_SPEED, 0)
+        off_screen = (self.bullet_y + self.BULLET_SIZE < 0) | (self.bullet_y > self.HEIGHT)
+        self.bullet_active &= ~(moving & off_screen)
+
+    def move_enemies(self, live):
+        cols = self.ENEMY_COLS
+        has_cols = self.col_counts > 0
+        left_col = np.argmax(has_cols, axis=1)
+        right_col = cols - 1 - np.argmax(has_cols[:, ::-1], axis=1)
+        left = self.formation_x + left_col * self.ENEMY_SPACING_X
+        right = self.formation_x + right_col * self.ENEMY_SPACING_X + self.ENEMY_SIZE
+        checking = live & (self.alive_count > 0)
+        hit_left = checking & (self.direction == -1) & (left <= 0)
+        hit_right = checking & (self.direction == 1) & (right >= self.WIDTH)
+        hit = hit_left | hit_right
+        dx = np.where(hit, 0, self.ENEMY_SPEED * self.direction)
+        dy = np.where(hit, self.ENEMY_DROP_SPEED, 0)
+        self.direction = np.where(hit_left, 1, np.where(hit_right, -1, self.direction))
+        self.formation_x += np.where(live, dx, 0)
+        self.formation_y += np.where(live, dy, 0)
+
+    def first_overlap(self, x1, y1, width, height, span, formation_x, formation_y, alive):
+        """
+        For rectangles (x1, y1, width, height) against their env's formation, returns
+        the lowest-index live enemy each overlaps, or -1. Shapes broadcast together.
+        """
+        size, sx, sy = self.ENEMY_SIZE, self.ENEMY_SPACING_X, self.ENEMY_SPACING_Y
+        rows, cols = self.ENEMY_ROWS, self.ENEMY_COLS
+        lx1 = x1 - formation_x
+        ly1 = y1 - formation_y
+        lx2 = lx1 + width
+        ly2 = ly1 + height
+        # Cells strictly overlapping: c*sx < lx2 and c*sx + size > lx1, likewise for rows.
+        col_lo = np.floor((lx1 - size) / sx).astype(np.int64) + 1
+        col_hi = np.ceil(lx2 / sx).astype(np.int64) - 1
+        row_lo = np.floor((ly1 - size) / sy).astype(np.int64) + 1
+        row_hi = np.ceil(ly2 / sy).astype(np.int64) - 1
+        target = np.full(np.broadcast(lx1, ly1).shape, -1, dtype=np.int64)
+        for dr in range(span[0]):
+            row = row_lo + dr
+            row_ok = (row <= row_hi) & (row >= 0) & (row < rows)
+            for dc in range(span[1]):
+                col = col_lo + dc
+                ok = row_ok & (col <= col_hi) & (col >= 0) & (col < cols) & (target < 0)
+                if not ok.any():
+                    continue
+                index = np.where(ok, row * cols + col, 0)
+                ok &= alive(index)
+                target = np.where(ok, index, target)
+        return target
+
+    def kill(self, envs, cells):
+        rows, cols = np.divmod(cells, self.ENEMY_COLS)
+        self.alive[envs, rows, cols] = False
+        np.subtract.at(self.col_counts, (envs, cols), 1)
+        np.subtract.at(self.row_counts, (envs, rows), 1)
+        np.subtract.at(self.alive_count, envs, 1)
+        np.add.at(self.score, envs, 10)
+
+    def check_collisions(self, live):
+        n = self.n
+        flat_alive = self.alive.reshape(n, -1)
+        active = self.bullet_active & live[:, None]
+        rows = self.env_index[:, None]
+        targets = self.first_overlap(
+            self.bullet_x, self.bullet_y, 2 * self.BULLET_HALF, self.BULLET_SIZE, self.bullet_span,
+            self.formation_x[:, None], self.formation_y[:, None],
+            lambda index: flat_alive[np.broadcast_to(rows, index.shape), index])
+        targets = np.where(active, targets, -1)
+
+        # Two bullets aiming at the same enemy in one tick must be resolved in
+        # firing order, as InvadersWorld does; those rare envs take the slow path.
+        ordered = np.sort(targets, axis=1)
+        conflict = ((ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] >= 0)).any(axis=1)
+        for env in np.flatnonzero(conflict):
+            self.resolve_in_order(env)
+        hits = (targets >= 0) & ~conflict[:, None]
+        envs, slots = np.nonzero(hits)
+        if len(envs):
+            self.kill(envs, targets[envs, slots])
+            self.bullet_active[envs, slots] = False
+
+        # Player-enemy collision
+        player = self.first_overlap(
+            self.player_x, self.player_y, self.PLAYER_SIZE, self.PLAYER_SIZE // 2, self.player_span,
+            self.formation_x, self.formation_y,
+            lambda index: flat_alive[self.env_index, index])
+        crashed = live & (player >= 0)
+        self.lives[crashed] -= 1
+        self.done |= crashed
+
+    def resolve_in_order(self, env):
+        """Resolves one env's bullet hits bullet by bullet, oldest first."""
+        flat_alive = self.alive.reshape(self.n, -1)
+        for slot in np.argsort(self.bullet_seq[env]):
+            if not self.bullet_active[env, slot]:
+                continue
+            target = self.first_overlap(
+                self.bullet_x[env, slot], self.bullet_y[env, slot], 2 * self.BULLET_HALF,
+                self.BULLET_SIZE, self.bullet_span, self.formation_x[env], self.formation_y[env],
+                lambda index: flat_alive[env, index])
+            if target >= 0:
+                self.kill(np.array([env]), np.array([int(target)]))
+                self.bullet_active[env, slot] = False